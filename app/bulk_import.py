@@ -0,0 +1,167 @@
+import asyncio
+from dataclasses import dataclass
+from typing import List, Optional
+from logger import logger
+from models.channel import Channel
+from config_utils import config_store
+from invites import invite_key
+
+FLAGS = ("NO_PHOTO", "NO_VIDEO")
+
+def target_config(tg_target: str) -> dict:
+    """Config stub for resolving a Telegram target given as username, tgid or invite link."""
+    if any(domain in tg_target for domain in ["t.me/", "telegram.me/", "telegram.dog/"]) or "+" in tg_target:
+        return {"username": tg_target}
+    if tg_target.startswith('-') or tg_target.isdigit():
+        return {"tgid": tg_target}
+    return {"username": tg_target}
+
+def is_invite_link(tg_target: str) -> bool:
+    return "+" in tg_target or "joinchat" in tg_target
+
+@dataclass
+class ImportItem:
+    """One target of a bulk import and what became of it."""
+    target: str
+    photo_enabled: bool = True
+    video_enabled: bool = True
+    tg_id: Optional[int] = None
+    name: Optional[str] = None
+    username: Optional[str] = None
+    chat_id: Optional[int] = None
+    invite: Optional[str] = None
+    entry: Optional[dict] = None
+    error: Optional[str] = None
+
+def parse_targets(text: str) -> List[ImportItem]:
+    """Targets separated by whitespace, commas or newlines.
+
+    `NO_PHOTO`/`NO_VIDEO` apply to the targets on their line; `#` starts a
+    comment.
+    """
+    items = []
+    for line in text.splitlines():
+        tokens = line.split("#", 1)[0].replace(",", " ").split()
+        flags = {t.upper() for t in tokens if t.upper() in FLAGS}
+        for token in tokens:
+            if token.upper() in FLAGS:
+                continue
+            items.append(ImportItem(token, photo_enabled="NO_PHOTO" not in flags, video_enabled="NO_VIDEO" not in flags))
+    return items
+
+def _mirrored_keys(entries) -> set:
+    keys = set()
+    for c in entries:
+        if c.get("tgid"):
+            keys.add(("tgid", str(c["tgid"])))
+        if c.get("username"):
+            keys.add(("username", str(c["username"]).lower()))
+    return keys
+
+def _item_keys(item: ImportItem) -> set:
+    keys = {("tgid", str(item.tg_id))}
+    if item.username:
+        keys.add(("username", item.username.lower()))
+    return keys
+
+def _create_broadcasts(rpc, accid, items) -> str:
+    # Runs in an executor so a few hundred RPC round trips do not stall relaying
+    key = invite_key(rpc, accid)
+    for item in items:
+        try:
+            item.chat_id = rpc.create_broadcast(accid, item.name)
+            try:
+                rpc.set_chat_visibility(accid, item.chat_id, "Normal")
+            except:
+                pass
+            item.invite = rpc.get_chat_securejoin_qr_code(accid, item.chat_id)
+        except Exception as e:
+            item.error = f"could not create broadcast: {e}"
+    return key
+
+async def import_channels(bridge, chan_repo, accid, items: List[ImportItem], concurrency: int = 8) -> List[ImportItem]:
+    """Resolve, join and set up many Telegram channels at once.
+
+    Targets are resolved by at most `concurrency` coroutines, broadcasts are
+    created in one batch, and config.yml and the channels table are each
+    written once. Returns the items that were set up; the others carry an
+    `error`. The caller registers the new channels with the running bridge.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def resolve(item):
+        async with semaphore:
+            try:
+                tg_id = await bridge._resolve_and_join_channel(target_config(item.target), accid)
+                if not tg_id:
+                    item.error = "could not resolve or join"
+                    return
+                entity = await bridge.client.get_entity(tg_id)
+            except Exception as e:
+                item.error = str(e)
+                return
+        item.tg_id = tg_id
+        item.name = getattr(entity, 'title', None) or 'New Channel'
+        item.username = getattr(entity, 'username', None)
+
+    logger.info(f"Bulk import: resolving {len(items)} Telegram targets ({concurrency} at a time)...")
+    await asyncio.gather(*(resolve(item) for item in items))
+
+    mirrored = _mirrored_keys(config_store.get().get("channels_to_mirror", []))
+    listed = set()
+    pending = []
+    for item in items:
+        if item.error:
+            continue
+        keys = _item_keys(item)
+        if keys & mirrored:
+            item.error = "already mirrored"
+        elif keys & listed:
+            item.error = "listed twice"
+        else:
+            listed |= keys
+            pending.append(item)
+
+    key = await asyncio.get_running_loop().run_in_executor(None, _create_broadcasts, bridge.rpc, accid, pending)
+    created = [item for item in pending if not item.error]
+    if not created:
+        return []
+
+    for item in created:
+        item.entry = {
+            "tgid": item.tg_id,
+            "username": item.username or item.target,
+            "chat_id": item.chat_id,
+            "name": item.name,
+            "photo": {"enable": item.photo_enabled},
+            "video": {"enable": item.video_enabled},
+        }
+    with config_store.edit() as full_config:
+        full_config.setdefault("channels_to_mirror", []).extend(item.entry for item in created)
+    if chan_repo:
+        chan_repo.save_many([
+            Channel(
+                accid=accid,
+                chat_id=item.chat_id,
+                name=item.name,
+                link=item.target if is_invite_link(item.target) else None,
+                photo_enabled=item.photo_enabled,
+                video_enabled=item.video_enabled,
+                invite_qr=item.invite,
+                invite_key=key,
+            )
+            for item in created
+        ])
+    logger.info(f"Bulk import: added {len(created)} of {len(items)} channels.")
+    return created
+
+def format_summary(items: List[ImportItem]) -> str:
+    added = [item for item in items if item.entry]
+    failed = [item for item in items if item.error]
+    lines = [f"Imported {len(added)} of {len(items)} channels."]
+    for item in added:
+        lines.append(f"- {item.name}\n  TG ID: {item.tg_id}, DC Chat ID: {item.chat_id}\n  Invite Link: {item.invite}")
+    if failed:
+        lines.append("\nErrors:")
+        lines.extend(f"- {item.target}: {item.error}" for item in failed)
+    return "\n".join(lines)
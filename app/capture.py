@@ -0,0 +1,193 @@
+import asyncio
+import itertools
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from logger import logger
+
+class UpdateRecorder:
+    """Appends compact JSONL records describing incoming Telegram updates.
+
+    Only metadata is kept: message text, button labels and URLs are reduced to
+    their length and media to its size and type, so recordings can be shared
+    for load testing.
+    """
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        self.flush_interval = flush_interval
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._last_flush = time.monotonic()
+        self.count = 0
+
+    def _write(self, record: dict):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.count += 1
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._file.flush()
+            self._last_flush = now
+
+    def record_message(self, kind: str, message, chat_id: int):
+        file = message.file
+        record = {
+            "t": time.time(),
+            "kind": kind,
+            "chat": chat_id,
+            "id": message.id,
+            "date": message.date.timestamp() if message.date else None,
+            "text_len": len(message.message or ""),
+        }
+        if message.grouped_id:
+            record["grouped_id"] = message.grouped_id
+        if message.reply_to_msg_id:
+            record["reply_to"] = message.reply_to_msg_id
+        if message.entities:
+            record["entities"] = [
+                {"type": type(e).__name__, "offset": e.offset, "length": e.length, "url_len": _len(getattr(e, "url", None))}
+                for e in message.entities
+            ]
+        if message.buttons:
+            record["buttons"] = [
+                [{"text_len": len(b.text or ""), "url_len": _len(getattr(b, "url", None))} for b in row]
+                for row in message.buttons
+            ]
+        wp = getattr(message, "web_preview", None)
+        if wp and getattr(wp, "url", None):
+            record["web_preview_len"] = len(wp.url)
+        if message.photo:
+            record["media"] = "photo"
+        elif message.video:
+            record["media"] = "video"
+        elif file:
+            record["media"] = "file"
+        if file:
+            record["media_size"] = file.size or 0
+            record["mime_type"] = file.mime_type
+        self._write(record)
+
+    def record_deletion(self, deleted_ids, chat_id: int):
+        self._write({"t": time.time(), "kind": "delete", "chat": chat_id, "ids": list(deleted_ids)})
+
+    def close(self):
+        self._file.flush()
+        self._file.close()
+
+def _len(value):
+    return len(value) if value is not None else None
+
+def _placeholder_url(length):
+    # Same length as the recorded URL, or None if there was none
+    if length is None:
+        return None
+    prefix = "https://example.com/"
+    return prefix + "x" * max(0, length - len(prefix))
+
+def load_recording(path: str) -> list[dict]:
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+class ReplayMessage:
+    """Rebuilds a Telethon-like message from a recorded update."""
+    def __init__(self, record: dict):
+        media = record.get("media")
+        media_info = SimpleNamespace(size=record.get("media_size", 0), mime_type=record.get("mime_type"))
+        self.id = record["id"]
+        self.chat_id = record["chat"]
+        self.message = "x" * record.get("text_len", 0)
+        self.photo = media_info if media == "photo" else None
+        self.video = media_info if media == "video" else None
+        self.file = media_info if media else None
+        self.grouped_id = record.get("grouped_id")
+        self.reply_to_msg_id = record.get("reply_to")
+        self.entities = [
+            SimpleNamespace(type=e["type"], offset=e["offset"], length=e["length"], url=_placeholder_url(e.get("url_len")))
+            for e in record["entities"]
+        ] if "entities" in record else None
+        self.buttons = [
+            [SimpleNamespace(text="x" * b.get("text_len", 0), url=_placeholder_url(b.get("url_len"))) for b in row]
+            for row in record["buttons"]
+        ] if "buttons" in record else None
+        self.web_preview = SimpleNamespace(url=_placeholder_url(record["web_preview_len"])) if "web_preview_len" in record else None
+        self.date = datetime.now(timezone.utc)
+        self.media_size = record.get("media_size", 0)
+
+    async def download_media(self, file=None):
+        # Size-only placeholder in place of the real payload
+        path = Path(file) / f"replay_{abs(self.chat_id)}_{self.id}"
+        path.write_bytes(b"\0" * self.media_size)
+        return str(path)
+
+    async def get_sender(self):
+        return None
+
+class ReplayRpc:
+    """Stands in for deltachat2.Rpc during replay; accepts every call."""
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self._ids = itertools.count(1)
+
+    def send_msg(self, accid, chat_id, data):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return next(self._ids)
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls += 1
+            if self.latency:
+                time.sleep(self.latency)
+        return call
+
+async def replay_recording(bridge, records: list[dict], speed: float = 1.0, accid: int = 1):
+    """Feed recorded updates through the bridge, keeping their relative timing.
+
+    `speed` scales the original pacing (10 = ten times faster); 0 replays
+    as fast as possible. Updates are dispatched as concurrent tasks, like
+    Telethon does for live traffic.
+    """
+    bridge.loop = asyncio.get_running_loop()
+    # Unconfigured chats get Delta Chat ids above every configured one
+    used = [cfg.get("chat_id") or 0 for cfg in [*bridge.tg_to_dc_map.values(), *bridge.channels_to_mirror]]
+    next_chat_id = itertools.count(max(used, default=0) + 1)
+    for record in records:
+        if record["chat"] not in bridge.tg_to_dc_map:
+            chat_id = next(next_chat_id)
+            bridge.tg_to_dc_map[record["chat"]] = {"tgid": record["chat"], "chat_id": chat_id}
+            bridge.target_chats.add(record["chat"])
+    bridge._rebuild_chat_filter()
+
+    tasks = []
+    start = time.perf_counter()
+    first_t = records[0]["t"] if records else 0
+    for record in records:
+        if speed:
+            delay = (record["t"] - first_t) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        channel_cfg = bridge.tg_to_dc_map[record["chat"]]
+        kind = record["kind"]
+        if kind == "new":
+            tasks.append(asyncio.create_task(bridge._relay_message(ReplayMessage(record), channel_cfg, accid)))
+        elif kind == "edit":
+            bridge._schedule_edit(ReplayMessage(record), channel_cfg, accid)
+        elif kind == "delete":
+            bridge._schedule_delete(record["ids"], channel_cfg, accid)
+
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    # Let debounced edits and batched deletions flush
+    if bridge._edit_timers or bridge._pending_deletes:
+        await asyncio.sleep(max(bridge.edit_debounce, bridge.delete_delay) + 0.1)
+    logger.info(f"Replayed {len(records)} updates ({len(tasks)} new messages) in {elapsed:.2f}s "
+                f"({len(tasks) / elapsed if elapsed else 0:.1f} msg/s)")
+    return elapsed
@@ -0,0 +1,48 @@
+import logging
+import queue
+import threading
+from logger import logger
+from metrics import metrics
+
+metrics.describe("bridge_admin_commands_queued", "gauge", "Admin commands waiting for a worker")
+
+class CommandPool:
+    """Small thread pool that runs admin commands off the Delta Chat event thread.
+
+    Commands do config writes, RPC round trips and repository queries; run
+    inline they would hold up `MemberAdded`/`MsgFailed` handling for the
+    mirrored channels. Every key (the admin's contact id) is pinned to one
+    worker, so an admin's commands run in the order they were sent while
+    different admins are served in parallel.
+    """
+    def __init__(self, workers: int = 4):
+        self._queues = [queue.SimpleQueue() for _ in range(max(1, workers))]
+        self._threads = []
+        for i, q in enumerate(self._queues):
+            thread = threading.Thread(target=self._run, args=(q,), name=f"admin-cmd-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        metrics.register_collector(self.collect_metrics)
+
+    def submit(self, key, func, *args):
+        self._queues[hash(key) % len(self._queues)].put((func, args))
+
+    def collect_metrics(self):
+        yield "bridge_admin_commands_queued", {}, sum(q.qsize() for q in self._queues)
+
+    def stop(self):
+        for q in self._queues:
+            q.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def _run(self, q):
+        while True:
+            item = q.get()
+            if item is None:
+                break
+            func, args = item
+            try:
+                func(*args)
+            except Exception as e:
+                logger.error(f"Admin command failed: {e}", exc_info=(logger.level <= logging.DEBUG))
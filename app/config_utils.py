@@ -1,16 +1,192 @@
-import yaml
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from logger import logger
+
+class ConfigStore:
+    """Parsed config.yml kept in memory and shared by the bot and bridge threads.
+
+    Changes are made inside `edit()`, which serializes them under one lock and
+    schedules a write. The write happens once no change was made for
+    `write_delay` seconds, so a burst of changes (e.g. tgid discovery for many
+    channels at startup) becomes one file write, but never later than
+    `max_write_delay` seconds after the first unwritten change. It is done
+    atomically via a temp file and rename.
+    Optionally a watcher thread picks up external edits of the file.
+    """
+    def __init__(self, path: str = "config.yml", write_delay: float = 1.0, max_write_delay: float = 10.0):
+        self.path = Path(path)
+        self.write_delay = write_delay
+        self.max_write_delay = max_write_delay
+        self._lock = threading.RLock()
+        self._config = None
+        self._mtime = None
+        self._dirty = False
+        self._dirty_since = None # monotonic time of the first unwritten change
+        self._timer = None
+        self._listeners = []
+        self._watcher = None
+
+    def _read(self) -> dict:
+        if not self.path.exists():
+            return {}
+        import yaml  # deferred so --help never pays for it
+        with open(self.path, "r") as f:
+            return yaml.safe_load(f) or {}
+
+    def get(self) -> dict:
+        """The shared config dict; only mutate it inside `edit()`."""
+        with self._lock:
+            if self._config is None:
+                self._config = self._read()
+                self._mtime = self._stat()
+            return self._config
+
+    @contextmanager
+    def edit(self):
+        with self._lock:
+            config = self.get()
+            try:
+                yield config
+            finally:
+                # Whatever was changed before an exception is already in the shared dict
+                self._schedule_write()
+
+    def channels(self) -> list:
+        """Copy of `channels_to_mirror` (or the legacy `out_channel`) taken under the lock.
+
+        The entries are still the store's dicts; change them only inside `edit()`.
+        """
+        with self._lock:
+            config = self.get()
+            channels = list(config.get("channels_to_mirror", []))
+            if not channels and "out_channel" in config:
+                channels = [config["out_channel"]]
+            return channels
+
+    def replace(self, config: dict):
+        """Swap in a whole config, keeping the shared dict object."""
+        with self._lock:
+            current = self.get()
+            if config is not current:
+                current.clear()
+                current.update(config)
+            self._schedule_write()
+
+    def _schedule_write(self):
+        now = time.monotonic()
+        if not self._dirty:
+            self._dirty = True
+            self._dirty_since = now
+        if self._timer:
+            self._timer.cancel()
+        delay = min(self.write_delay, max(0.0, self._dirty_since + self.max_write_delay - now))
+        self._timer = threading.Timer(delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        """Write pending changes now."""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            import yaml
+            tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+            try:
+                with open(tmp_path, "w") as f:
+                    yaml.safe_dump(self._config, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+                self._dirty_since = None
+                self._mtime = self._stat()
+            except Exception as e:
+                logger.error(f"Failed to write {self.path}: {e}")
+
+    def _stat(self):
+        try:
+            return self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def subscribe(self, callback):
+        """Register callback(config) to be called after external edits were loaded."""
+        self._listeners.append(callback)
+
+    def _load_from_disk(self, mtime):
+        new_config = self._read()
+        self._mtime = mtime
+        self._config.clear()
+        self._config.update(new_config)
+
+    def _notify(self):
+        for callback in self._listeners:
+            try:
+                callback(self._config)
+            except Exception as e:
+                logger.error(f"Config reload callback failed: {e}")
+
+    def reload(self, notify: bool = True) -> dict:
+        """Read the file again now; it wins over changes not yet written."""
+        with self._lock:
+            self.get()
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            if self._dirty:
+                logger.warning(f"Discarding unwritten config changes, reloading {self.path}")
+                self._dirty = False
+                self._dirty_since = None
+            self._load_from_disk(self._stat())
+        if notify:
+            self._notify()
+        return self._config
+
+    def reload_if_changed(self) -> bool:
+        """Load the file again if something other than this store changed it."""
+        with self._lock:
+            mtime = self._stat()
+            if self._config is None or mtime == self._mtime:
+                return False
+            if self._dirty:
+                logger.warning(f"{self.path} changed on disk while local changes are pending; keeping local changes")
+                return False
+            try:
+                self._load_from_disk(mtime)
+            except Exception as e:
+                logger.error(f"Ignoring invalid {self.path}: {e}")
+                self._mtime = mtime
+                return False
+            logger.info(f"Reloaded {self.path} after external change")
+        self._notify()
+        return True
+
+    def start_watch(self, interval: float = 2.0):
+        """Poll the file's mtime on a daemon thread."""
+        if self._watcher:
+            return
+        stop = threading.Event()
+        def watch():
+            while not stop.wait(interval):
+                self.reload_if_changed()
+        self._watcher = threading.Thread(target=watch, name="config-watch", daemon=True)
+        self._watcher.start()
+        logger.info(f"Watching {self.path} for changes every {interval}s")
+
+config_store = ConfigStore()
+atexit.register(config_store.flush)
 
 def load_config():
-    config_path = Path("config.yml")
-    if config_path.exists():
-        with open(config_path, "r") as f:
-            return yaml.safe_load(f)
-    return {}
+    """The shared, parsed config; mutate it only inside `config_store.edit()`."""
+    return config_store.get()
 
 def save_config(config):
-    config_path = Path("config.yml")
-    if not config_path.exists():
-        config_path.touch()
-    with open(config_path, "w") as f:
-        yaml.safe_dump(config, f)
+    """Replace the stored config and schedule a debounced atomic write."""
+    config_store.replace(config)
@@ -1,79 +1,134 @@
 import sqlite3
 from pathlib import Path
+from logger import logger
 
-def init_db(db_path: str):
-    Path(db_path).parent.mkdir(exist_ok=True, parents=True)
-    with sqlite3.connect(db_path) as conn:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS channels (
-                accid INTEGER,
-                chat_id INTEGER,
-                name TEXT,
-                link TEXT,
-                photo_enabled INTEGER DEFAULT 1,
-                photo_message TEXT DEFAULT '[Photo]',
-                video_enabled INTEGER DEFAULT 1,
-                video_message TEXT DEFAULT '[Video]',
-                enabled INTEGER DEFAULT 1,
-                PRIMARY KEY (accid, chat_id)
-            )
-        """)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS admins (
-                contact_id INTEGER PRIMARY KEY
-            )
-        """)
-        # Added dc_msg_id and dc_chat_id to store Delta Chat database ID and chat association
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                telegram_msg_id INTEGER,
-                dc_msg_id INTEGER,
-                dc_chat_id INTEGER,
-                text TEXT,
-                media_path TEXT,
-                media_type TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Migration: ensure telegram_msg_id + dc_chat_id is indexed and unique
-        conn.execute("DROP INDEX IF EXISTS idx_messages_tgid")
-        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_tgid_chat ON messages(dc_chat_id, telegram_msg_id)")
-        
-        # Migration: if dc_msg_id doesn't exist, add it
-        try:
-            conn.execute("ALTER TABLE messages ADD COLUMN dc_msg_id INTEGER")
-        except sqlite3.OperationalError:
-            pass # already exists
+# Schema changes are numbered migrations applied in order. PRAGMA user_version
+# stores the number of the last applied one, so an up-to-date database costs a
+# single pragma read at startup. Append new migrations; never edit old ones.
+
+def _columns(conn, table: str) -> set:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def _add_missing_columns(conn, table: str, columns: list[tuple[str, str]]):
+    existing = _columns(conn, table)
+    for name, ddl in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+
+def _migration_1_baseline(conn):
+    """Initial schema; also upgrades databases created before versioning."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS channels (
+            accid INTEGER,
+            chat_id INTEGER,
+            name TEXT,
+            link TEXT,
+            photo_enabled INTEGER DEFAULT 1,
+            photo_message TEXT DEFAULT '[Photo]',
+            video_enabled INTEGER DEFAULT 1,
+            video_message TEXT DEFAULT '[Video]',
+            enabled INTEGER DEFAULT 1,
+            PRIMARY KEY (accid, chat_id)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS admins (
+            contact_id INTEGER PRIMARY KEY
+        )
+    """)
+    # dc_msg_id and dc_chat_id store the Delta Chat database ID and chat association
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_msg_id INTEGER,
+            dc_msg_id INTEGER,
+            dc_chat_id INTEGER,
+            text TEXT,
+            media_path TEXT,
+            media_type TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # Older databases predate these columns
+    _add_missing_columns(conn, "messages", [
+        ("dc_msg_id", "INTEGER"),
+        ("dc_chat_id", "INTEGER"),
+    ])
+    _add_missing_columns(conn, "channels", [
+        ("photo_enabled", "INTEGER DEFAULT 1"),
+        ("photo_message", "TEXT DEFAULT '[Photo]'"),
+        ("video_enabled", "INTEGER DEFAULT 1"),
+        ("video_message", "TEXT DEFAULT '[Video]'"),
+        ("enabled", "INTEGER DEFAULT 1"),
+    ])
+    # telegram_msg_id is only unique per channel
+    conn.execute("DROP INDEX IF EXISTS idx_messages_tgid")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_tgid_chat ON messages(dc_chat_id, telegram_msg_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_chatid ON messages(dc_chat_id)")
+
+def _migration_2_latest_history_index(conn):
+    """Covering partial index for the latest-history lookup."""
+    # get_latest_ids reads only these columns of relayed rows, newest first,
+    # so it is answered from the index without touching the wide table rows
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_messages_latest
+        ON messages(dc_chat_id, telegram_msg_id DESC, dc_msg_id)
+        WHERE dc_msg_id IS NOT NULL
+    """)
+    # Redundant with the leading column of idx_messages_tgid_chat
+    conn.execute("DROP INDEX IF EXISTS idx_messages_chatid")
 
-        # Migration: if dc_chat_id doesn't exist, add it
-        try:
-            conn.execute("ALTER TABLE messages ADD COLUMN dc_chat_id INTEGER")
-        except sqlite3.OperationalError:
-            pass # already exists
+def _migration_3_invite_cache(conn):
+    """Cached securejoin invite per channel."""
+    # invite_key records which account address the QR code was generated for
+    _add_missing_columns(conn, "channels", [
+        ("invite_qr", "TEXT"),
+        ("invite_key", "TEXT"),
+    ])
 
-        # Create index for dc_chat_id after ensuring column exists
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_chatid ON messages(dc_chat_id)")
+MIGRATIONS = [
+    (1, _migration_1_baseline),
+    (2, _migration_2_latest_history_index),
+    (3, _migration_3_invite_cache),
+]
 
-        # Migration: if photo_enabled doesn't exist, add its set
-        try:
-            conn.execute("ALTER TABLE channels ADD COLUMN photo_enabled INTEGER DEFAULT 1")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            conn.execute("ALTER TABLE channels ADD COLUMN photo_message TEXT DEFAULT '[Photo]'")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            conn.execute("ALTER TABLE channels ADD COLUMN video_enabled INTEGER DEFAULT 1")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            conn.execute("ALTER TABLE channels ADD COLUMN video_message TEXT DEFAULT '[Video]'")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            conn.execute("ALTER TABLE channels ADD COLUMN enabled INTEGER DEFAULT 1")
-        except sqlite3.OperationalError:
-            pass
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn) -> int:
+    """Apply pending migrations in a single transaction; returns the number applied."""
+    current = get_schema_version(conn)
+    if current > SCHEMA_VERSION:
+        raise RuntimeError(f"Database schema version {current} is newer than supported version {SCHEMA_VERSION}")
+    pending = [(version, func) for version, func in MIGRATIONS if version > current]
+    if not pending:
+        return 0
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for version, func in pending:
+            logger.info(f"Applying database migration {version}: {func.__doc__ or func.__name__}")
+            func(conn)
+        # user_version is part of the database header, so it commits with the schema changes
+        conn.execute(f"PRAGMA user_version = {pending[-1][0]}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return len(pending)
+
+def init_db(db_path: str):
+    Path(db_path).parent.mkdir(exist_ok=True, parents=True)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        if get_schema_version(conn) == SCHEMA_VERSION:
+            return
+        if not conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone():
+            # Only takes effect before the first table exists; lets retention return freed pages
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        if migrate(conn):
+            logger.info(f"Database {db_path} migrated to schema version {SCHEMA_VERSION}")
+    finally:
+        conn.close()
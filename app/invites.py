@@ -0,0 +1,40 @@
+from typing import Iterable
+from logger import logger
+from models.channel import Channel
+
+def invite_key(rpc, accid: int) -> str:
+    """What the cached securejoin QR codes of an account depend on besides the chat.
+
+    The QR code embeds the account's address; when it changes (e.g. after a
+    transport change) every cached code is stale.
+    """
+    try:
+        return rpc.get_config(accid, "configured_addr") or ""
+    except Exception as e:
+        logger.debug(f"Could not read configured_addr of account {accid}: {e}")
+        return ""
+
+def invite_links(rpc, chan_repo, accid: int, channels: Iterable[Channel], refresh: bool = False) -> dict:
+    """chat_id -> securejoin QR data, served from the channels table where possible.
+
+    Only codes that are missing or were cached under a different key are
+    fetched over RPC; they are stored back in one transaction. A recreated
+    chat has a new chat_id and therefore no cached code.
+    """
+    key = invite_key(rpc, accid)
+    links = {}
+    fetched = []
+    for chan in channels:
+        if chan.invite_qr and chan.invite_key == key and not refresh:
+            links[chan.chat_id] = chan.invite_qr
+            continue
+        try:
+            qr = rpc.get_chat_securejoin_qr_code(accid, chan.chat_id)
+        except Exception as e:
+            logger.warning(f"Could not get invite link for chat {chan.chat_id}: {e}")
+            continue
+        links[chan.chat_id] = qr
+        fetched.append((chan.chat_id, qr, key))
+    if fetched:
+        chan_repo.update_invites(accid, fetched)
+    return links
@@ -1,29 +1,157 @@
+import atexit
+import gzip
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import shutil
 import sys
+import threading
+import time
 from pathlib import Path
 
+FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+class RateLimitFilter(logging.Filter):
+    """Caps INFO-and-below records per log statement (file:line) per second.
+
+    Per-message relay lines can fire thousands of times a minute; warnings
+    and errors are never limited. Suppressed counts are reported on the
+    next record that gets through.
+    """
+    def __init__(self, per_second: float):
+        super().__init__()
+        self.per_second = per_second
+        self._windows = {} # (pathname, lineno) -> [window_start, count, suppressed]
+
+    def filter(self, record):
+        if record.levelno > logging.INFO:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= 1.0:
+            suppressed = window[2] if window else 0
+            self._windows[key] = [now, 1, 0]
+            if suppressed:
+                record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+                record.args = None
+            return True
+        if window[1] < self.per_second:
+            window[1] += 1
+            return True
+        window[2] += 1
+        return False
+
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+def _make_file_handler(log_cfg: dict, log_file: str) -> logging.Handler:
+    Path(log_file).parent.mkdir(exist_ok=True, parents=True)
+    when = log_cfg.get("rotate_when")
+    backup_count = log_cfg.get("backup_count", 5)
+    if when:
+        handler = logging.handlers.TimedRotatingFileHandler(log_file, when=when, backupCount=backup_count)
+    else:
+        handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=log_cfg.get("max_bytes", 10 * 1024 * 1024), backupCount=backup_count)
+    if log_cfg.get("compress", False):
+        handler.namer = lambda name: f"{name}.gz"
+        handler.rotator = _gzip_rotator
+    return handler
+
+class JsonEventFormatter(logging.Formatter):
+    """One compact JSON object per record, from the `event` dict passed via extra."""
+    def format(self, record):
+        return json.dumps({"ts": round(record.created, 3), **record.event}, separators=(",", ":"), default=str)
+
+class BufferedHandler(logging.handlers.MemoryHandler):
+    """Buffers records and hands them to the target in batches.
+
+    The buffer is written when it is full, at the latest `interval` seconds
+    after the last write (by a timer thread, so quiet periods do not strand
+    records), and always on close.
+    """
+    def __init__(self, target, capacity: int = 256, interval: float = 1.0):
+        super().__init__(capacity, flushLevel=logging.CRITICAL + 1, target=target, flushOnClose=True)
+        self.interval = interval
+        self._last_flush = time.monotonic()
+        self._stop_flush = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="event-log-flush", daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._stop_flush.wait(self.interval):
+            if self.buffer and time.monotonic() - self._last_flush >= self.interval:
+                self.flush()
+
+    def shouldFlush(self, record):
+        return len(self.buffer) >= self.capacity or time.monotonic() - self._last_flush >= self.interval
+
+    def flush(self):
+        super().flush()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self._stop_flush.set()
+        target = self.target
+        super().close()
+        if target:
+            target.close()
+
+_listeners = {} # logger name -> QueueListener
+
+def _start_listener(logger: logging.Logger, handlers: list, rate_limit: float = 0, formatter=None):
+    """Route the logger through a queue drained by a dedicated writer thread."""
+    listener = _listeners.pop(logger.name, None)
+    if listener:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    formatter = formatter or logging.Formatter(FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    if rate_limit:
+        queue_handler.addFilter(RateLimitFilter(rate_limit))
+    logger.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners[logger.name] = listener
+
+def _stop_listeners():
+    for listener in list(_listeners.values()):
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+atexit.register(_stop_listeners)
+
 def get_logger(name="deltabot-telegram-bridge", level=logging.INFO, log_file=None):
     logger = logging.getLogger(name)
     if not logger.handlers:
         logger.setLevel(level)
-        
+
         # Console handler
-        console_handler = logging.StreamHandler(sys.stdout)
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
-        
+        handlers = [logging.StreamHandler(sys.stdout)]
+
         # File handler if specified
         if log_file:
             try:
-                # Ensure directory exists
-                Path(log_file).parent.mkdir(exist_ok=True, parents=True)
-                file_handler = logging.FileHandler(log_file)
-                file_handler.setFormatter(formatter)
-                logger.addHandler(file_handler)
+                handlers.append(_make_file_handler({}, log_file))
             except Exception as e:
                 print(f"Failed to setup file logging: {e}")
-                
+
+        _start_listener(logger, handlers)
+
     return logger
 
 def setup_logging(config: dict):
@@ -31,16 +159,43 @@ def setup_logging(config: dict):
     level_str = log_cfg.get("level", "DEBUG" if config.get("debug") else "INFO").upper()
     level = getattr(logging, level_str, logging.INFO)
     log_file = log_cfg.get("file")
-    
+
     logger.setLevel(level)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    file_error = None
     if log_file:
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
         try:
-            Path(log_file).parent.mkdir(exist_ok=True, parents=True)
-            file_handler = logging.FileHandler(log_file)
-            file_handler.setFormatter(formatter)
-            logger.addHandler(file_handler)
+            handlers.append(_make_file_handler(log_cfg, log_file))
+        except Exception as e:
+            file_error = e
+
+    # Replaces the handlers set up by get_logger, so the file is only attached once
+    _start_listener(logger, handlers, rate_limit=log_cfg.get("rate_limit", 0))
+    if file_error:
+        logger.error(f"Failed to setup file logging: {file_error}")
+
+    events_cfg = log_cfg.get("events", {})
+    if events_cfg.get("enabled", False):
+        try:
+            events_file = events_cfg.get("file", "data/events.jsonl")
+            target = _make_file_handler(events_cfg, events_file)
+            target.setFormatter(JsonEventFormatter())
+            _start_listener(event_logger, [BufferedHandler(target, interval=events_cfg.get("flush_interval", 1.0))], formatter=JsonEventFormatter())
+            event_logger.setLevel(logging.INFO)
+            logger.info(f"Structured event log enabled: {events_file}")
         except Exception as e:
-            logger.error(f"Failed to setup file logging: {e}")
+            logger.error(f"Failed to setup event log: {e}")
 
 logger = get_logger()
+
+# Structured relay audit log; disabled until setup_logging enables it
+event_logger = logging.getLogger("deltabot-telegram-bridge.events")
+event_logger.propagate = False
+event_logger.setLevel(logging.CRITICAL + 1)
+
+def events_enabled() -> bool:
+    """Cheap guard so callers only build event records when the log is on."""
+    return event_logger.isEnabledFor(logging.INFO)
+
+def log_event(kind: str, **fields):
+    event_logger.info(kind, extra={"event": {"event": kind, **fields}})
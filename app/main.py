@@ -1,29 +1,28 @@
+from __future__ import annotations
+
 import sys
 import os
 import argparse
-import yaml
 import time
 import getpass
 import logging
 import signal
-import asyncio
-from threading import Thread
+from threading import Thread, get_ident
+from dataclasses import replace
 from pathlib import Path
-from typing import Optional
-
-from deltachat2 import Bot, Rpc, IOTransport, EventType, CoreEvent, Event, MsgData, events, JsonRpcError
-from deltachat2.events import RawEvent, HookCollection
-from telethon import utils
+from typing import Optional, TYPE_CHECKING
 
-from logger import logger, setup_logging
+from logger import logger, setup_logging, events_enabled, log_event
 from repository.channel_repository import ChannelRepository
-from repository.message_repository import MessageRepository
 from models.channel import Channel
 from db import init_db
-from telegram_bridge import start_telegram_bridge, init_telegram_session, sync_tg_info_to_dc
+from config_utils import config_store, load_config, save_config
 
-from config_utils import load_config, save_config
-from repository.admin_repository import AdminRepository
+# Telethon, deltachat2 and asyncio dominate startup, so they are imported by
+# the modes that use them (see bench/import_time_bench.py).
+if TYPE_CHECKING:
+    from deltachat2 import Bot, Rpc
+    from deltachat2.events import HookCollection
 
 def apply_dc_proxy_config(rpc: Rpc, accid: int, proxy_cfg: Optional[dict]):
     if not proxy_cfg:
@@ -67,6 +66,7 @@ def apply_dc_proxy_config(rpc: Rpc, accid: int, proxy_cfg: Optional[dict]):
         rpc.set_config(accid, "proxy_enabled", "0")
 
 def process_init_events(bot: Bot):
+    from deltachat2 import EventType, CoreEvent
     events_to_log = (EventType.INFO, EventType.WARNING, EventType.ERROR)
     last_progress = -1
     while True:
@@ -99,6 +99,7 @@ def process_init_events(bot: Bot):
             break
 
 def init_account(bot: Bot, addr: str, proxy_cfg: dict = None):
+    from deltachat2 import JsonRpcError
     accid = bot.rpc.add_account()
     if proxy_cfg:
         apply_dc_proxy_config(bot.rpc, accid, proxy_cfg)
@@ -127,6 +128,7 @@ def init_account(bot: Bot, addr: str, proxy_cfg: dict = None):
         sys.exit(1)
 
 def setup_channel(bot: Bot, accid: int, channel_cfg: dict) -> int:
+    from deltachat2 import MsgData, JsonRpcError
     name = channel_cfg.get("name", channel_cfg.get("username", "Telegram Bridge Channel"))
     avatar = channel_cfg.get("avatar")
     chat_id = channel_cfg.get("chat_id")
@@ -149,7 +151,8 @@ def setup_channel(bot: Bot, accid: int, channel_cfg: dict) -> int:
         except:
             pass
         
-        channel_cfg["chat_id"] = chat_id
+        with config_store.edit():
+            channel_cfg["chat_id"] = chat_id
         if channel_cfg.get("send_start", False):
             # Initial promotion
             bot.rpc.send_msg(accid, chat_id, MsgData(text="start"))
@@ -170,17 +173,27 @@ def setup_channel(bot: Bot, accid: int, channel_cfg: dict) -> int:
             
     return chat_id
 
-def run_bot(rpc: Rpc, hooks: HookCollection):
+def run_bot(rpc: Rpc, hooks: HookCollection, capture_file: Optional[str] = None):
+    import asyncio
+    from deltachat2 import Bot, MsgData, events
+    from repository.message_repository import MessageRepository
+    from repository.admin_repository import AdminRepository
+    from telegram_bridge import start_telegram_bridge
+    from bulk_import import import_channels, parse_targets, format_summary, target_config, is_invite_link
+    from invites import invite_links
+    from profiling import ProfileSession, describe_tasks
+    from retention import RetentionJob
+    from command_pool import CommandPool
+    from membership import MembershipTracker
+    from startup import Startup
+    from metrics import metrics, start_metrics_server, track_telethon_reconnects
+
     config = load_config()
     active_accid = config.get("active_accid")
-    channels_to_mirror = config.get("channels_to_mirror", [])
+    # Startup snapshot; /reload and the watcher change the store's list, not this one
+    channels_to_mirror = config_store.channels()
     accounts_config = config.get("accounts", [])
     
-    # Legacy support
-    if not channels_to_mirror and "out_channel" in config:
-        channels_to_mirror = [config["out_channel"]]
-        # also need to add tgid/username if missing, but it might be hard here
-    
     channel_ids = [c.get("chat_id") for c in channels_to_mirror if c.get("chat_id")]
     chat_id_to_cfg = {c.get("chat_id"): c for c in channels_to_mirror if c.get("chat_id")}
     
@@ -196,9 +209,186 @@ def run_bot(rpc: Rpc, hooks: HookCollection):
     history_limit = history_config.get("limit", 10)
     logger.info(f"History resend: {'enabled' if history_enabled else 'disabled'} (limit: {history_limit})")
 
+    bulk_concurrency = config.get("bulk_import", {}).get("concurrency", 8)
+    links_page_size = max(1, config.get("links", {}).get("page_size", 20))
+    command_pool = CommandPool(config.get("admin_commands", {}).get("workers", 4))
+    membership_cfg = config.get("membership", {})
+    membership = MembershipTracker(
+        rpc, chan_repo,
+        debounce=membership_cfg.get("debounce", 5),
+        reconcile_interval=membership_cfg.get("reconcile_interval", 3600),
+        max_delay=membership_cfg.get("max_delay", 60),
+    )
+
     last_resend_times = {} # chat_id -> timestamp
     cooldown = 10 # seconds
 
+    startup = Startup()
+    hook_thread = {} # "ident" of the Delta Chat event thread, seen by handle_msg
+    profiler = ProfileSession(top_n=config.get("profiling", {}).get("top_n", 20))
+
+    retention = None
+    if config.get("retention", {}).get("enabled", False):
+        retention = RetentionJob(db_path, config)
+        retention.start()
+
+    def _media_settings(cfg):
+        photo_cfg = cfg.get("photo", {})
+        video_cfg = cfg.get("video", {})
+        return (
+            cfg.get("name"),
+            photo_cfg.get("enable", True), photo_cfg.get("message", "[Photo]"),
+            video_cfg.get("enable", True), video_cfg.get("message", "[Video]"),
+        )
+
+    def _same_source(old_cfg, new_cfg):
+        # A tgid discovered at runtime may not be in the new file yet
+        if str(old_cfg.get("username") or "") != str(new_cfg.get("username") or ""):
+            return False
+        return not (old_cfg.get("tgid") and new_cfg.get("tgid")) or str(old_cfg.get("tgid")) == str(new_cfg.get("tgid"))
+
+    async def apply_channels(bridge, accid, entries):
+        """Bring the running routing state in line with a new channels_to_mirror."""
+        current = dict(chat_id_to_cfg)
+        by_source = {}
+        for cid, cfg in current.items():
+            for key in ("tgid", "username"):
+                if cfg.get(key):
+                    by_source[(key, str(cfg[key]))] = cid
+
+        kept, added, removed, updated, failed = {}, [], [], [], []
+        for cfg in entries:
+            cid = cfg.get("chat_id")
+            if not cid:
+                # Entry re-added without its chat_id: keep using the existing broadcast
+                cid = next((by_source[(key, str(cfg[key]))] for key in ("tgid", "username")
+                            if cfg.get(key) and (key, str(cfg[key])) in by_source), None)
+                if cid and cid not in kept:
+                    with config_store.edit():
+                        cfg["chat_id"] = cid
+            if cid in kept:
+                failed.append(f"{cid} (duplicate entry)")
+            elif cid in current:
+                kept[cid] = cfg
+            else:
+                added.append(cfg)
+
+        # Runs on the Telegram loop: SQLite goes through the bridge's DB worker,
+        # RPC calls to an executor thread
+        chans = bridge.async_chan_repo
+        loop = asyncio.get_running_loop()
+
+        # Media settings of all kept channels go to the DB in one transaction
+        stored = {c.chat_id: c for c in await chans.get_by_accid(accid)}
+        changed_channels = []
+        for cid, cfg in kept.items():
+            old_cfg = current[cid]
+            chat_id_to_cfg[cid] = cfg
+            source_changed = not _same_source(old_cfg, cfg)
+            if source_changed:
+                await bridge.remove_dynamic_channel(cid)
+                if not await bridge.add_dynamic_channel(cfg, accid):
+                    failed.append(f"{cfg.get('username') or cfg.get('tgid')} (could not resolve)")
+            else:
+                bridge.replace_channel_config(cfg)
+            settings_changed = _media_settings(old_cfg) != _media_settings(cfg) or cid not in stored
+            if settings_changed:
+                name, photo_enabled, photo_message, video_enabled, video_message = _media_settings(cfg)
+                base = stored.get(cid) or Channel(accid=accid, chat_id=cid, name=name or "Unknown")
+                changed_channels.append(replace(
+                    base, name=name or base.name,
+                    photo_enabled=photo_enabled, photo_message=photo_message,
+                    video_enabled=video_enabled, video_message=video_message,
+                ))
+            if source_changed or settings_changed:
+                updated.append(cid)
+        if changed_channels:
+            await chans.save_many(changed_channels)
+
+        for cid in current:
+            if cid in kept:
+                continue
+            if cid in channel_ids:
+                channel_ids.remove(cid)
+            chat_id_to_cfg.pop(cid, None)
+            await chans.delete(accid, cid)
+            membership.forget(cid)
+            await bridge.remove_dynamic_channel(cid)
+            removed.append(cid)
+
+        added_ids = []
+        for cfg in added:
+            label = cfg.get("username") or cfg.get("tgid") or cfg.get("chat_id")
+            try:
+                cid = cfg.get("chat_id")
+                if not cid:
+                    tg_id = await bridge._resolve_and_join_channel(cfg, accid)
+                    if not tg_id:
+                        failed.append(f"{label} (could not resolve)")
+                        continue
+                    entity = await bridge.client.get_entity(tg_id)
+                    name = cfg.get("name") or getattr(entity, "title", "New Channel")
+                    cid = await loop.run_in_executor(None, bot.rpc.create_broadcast, accid, name)
+                    try:
+                        await loop.run_in_executor(None, bot.rpc.set_chat_visibility, accid, cid, "Normal")
+                    except:
+                        pass
+                    with config_store.edit():
+                        cfg["chat_id"] = cid
+                        cfg.setdefault("name", name)
+                if not await chans.get_by_chat_id(accid, cid):
+                    name, photo_enabled, photo_message, video_enabled, video_message = _media_settings(cfg)
+                    await chans.save(Channel(
+                        accid=accid, chat_id=cid, name=name or "Unknown",
+                        photo_enabled=photo_enabled, photo_message=photo_message,
+                        video_enabled=video_enabled, video_message=video_message,
+                    ))
+                if cid not in channel_ids:
+                    channel_ids.append(cid)
+                chat_id_to_cfg[cid] = cfg
+                if not await bridge.add_dynamic_channel(cfg, accid):
+                    failed.append(f"{label} (could not resolve)")
+                added_ids.append(cid)
+            except Exception as e:
+                logger.error(f"Failed to add channel {label} on reload: {e}")
+                failed.append(f"{label} ({e})")
+
+        summary = (f"Reloaded channels_to_mirror: {len(added_ids)} added, {len(removed)} removed, "
+                   f"{len(updated)} updated, {len(kept) - len(updated)} unchanged.")
+        if failed:
+            summary += "\nFailed:\n" + "\n".join(f"- {f}" for f in failed)
+        return summary
+
+    reload_state = {"future": None}
+
+    def reload_channels(reply=None, from_disk=True):
+        """Re-read config.yml and apply channels_to_mirror on the bridge loop."""
+        reply = reply or logger.info
+        bridge = bridge_container.get('bridge')
+        if not (bridge and bridge.loop):
+            reply("Telegram bridge not ready yet.")
+            return
+        pending = reload_state["future"]
+        if pending and not pending.done():
+            reply("A reload is already in progress.")
+            return
+        try:
+            new_config = config_store.reload(notify=False) if from_disk else config_store.get()
+        except Exception as e:
+            reply(f"Could not read {config_store.path}: {e}")
+            return
+        entries = new_config.get("channels_to_mirror", [])
+        future = asyncio.run_coroutine_threadsafe(apply_channels(bridge, acc_to_run, entries), bridge.loop)
+
+        def done(f):
+            try:
+                reply(f.result())
+            except Exception as e:
+                logger.error(f"Channel reload failed: {e}")
+                reply(f"Reload failed: {e}")
+        future.add_done_callback(done)
+        reload_state["future"] = future
+
     @hooks.on(events.RawEvent)
     def log_events(bot, accid, event):
         nonlocal last_resend_times
@@ -209,7 +399,10 @@ def run_bot(rpc: Rpc, hooks: HookCollection):
             return
 
         if kind == "MsgFailed":
+            metrics.inc("bridge_dc_msg_failed_total", channel=chat_id)
             msg_id = event.get("msg_id")
+            if events_enabled():
+                log_event("dc_msg_failed", dc_chat=chat_id, dc_msg_id=msg_id)
             if msg_id:
                 try:
                     # Using get_message (not get_message_view) to fetch the message data
@@ -232,7 +425,7 @@ def run_bot(rpc: Rpc, hooks: HookCollection):
                 logger.error(f"Channel {chat_id} has a MsgFailed event but no msg_id was provided in the event data.")
             return
 
-        logger.info(f"Channel {chat_id} has new event: {kind}")
+        logger.info("Channel %s has new event: %s", chat_id, kind)
 
         # Events that indicate a new member or a potential need for history resend
         join_events = ("MemberAdded", "SecurejoinInviterProgress", "SecureJoinQrScanSuccess")
@@ -242,6 +435,7 @@ def run_bot(rpc: Rpc, hooks: HookCollection):
             if kind == "SecurejoinInviterProgress" and event.get("progress") != 1000:
                 return
 
+            membership.member_added(accid, chat_id, event.get("contact_id"))
             try:
                 # Always "Accept" the chat to ensure it's in the Normal list (especially if it was a Request)
                 # This covers the "accept it always" requirement.
@@ -262,43 +456,45 @@ def run_bot(rpc: Rpc, hooks: HookCollection):
                         logger.info(f"Join event detected in chat {chat_id} ({kind}). Preparing history resend...")
                         try:
                             valid_dc_msg_ids = []
-                            messages = msg_repo.get_latest(chat_id, limit=history_limit)
-                            for m in messages:
+                            for _, dc_msg_id in msg_repo.get_latest_ids(chat_id, limit=history_limit):
                                 # Verify the message still exists in DC
                                 try:
-                                    if bot.rpc.get_existing_msg_ids(accid, [m.dc_msg_id]):
-                                        valid_dc_msg_ids.append(m.dc_msg_id)
+                                    if bot.rpc.get_existing_msg_ids(accid, [dc_msg_id]):
+                                        valid_dc_msg_ids.append(dc_msg_id)
                                     else:
-                                        logger.debug(f"Message {m.dc_msg_id} no longer exists in Delta Chat, skipping.")
+                                        logger.debug(f"Message {dc_msg_id} no longer exists in Delta Chat, skipping.")
                                 except Exception:
-                                    logger.debug(f"Message {m.dc_msg_id} no longer exists in Delta Chat, skipping.")
+                                    logger.debug(f"Message {dc_msg_id} no longer exists in Delta Chat, skipping.")
 
                             # If we don't have enough VALID messages in DC, fetch from Telegram
                             # fetch_history will handle both resending existing and relaying missing ones.
                             if len(valid_dc_msg_ids) < history_limit:
-                                bridge = bridge_container.get('bridge')
                                 channel_cfg = chat_id_to_cfg.get(chat_id)
-                                if bridge and bridge.loop and channel_cfg:
-                                    tg_target = channel_cfg.get('tgid') or channel_cfg.get('username')
-                                    if tg_target:
-                                        logger.info(f"Insufficient local valid history ({len(valid_dc_msg_ids)}/{history_limit}). Triggering Telegram fetch for {tg_target}...")
-                                        # Record sync attempt before starting async task to prevent overlaps
-                                        last_resend_times[chat_id] = current_time
+                                tg_target = channel_cfg and (channel_cfg.get('tgid') or channel_cfg.get('username'))
+                                if tg_target:
+                                    def fetch(bridge, tg_target=tg_target, accid=accid):
                                         asyncio.run_coroutine_threadsafe(
                                             bridge.fetch_history(tg_target, limit=history_limit, accid=accid),
                                             bridge.loop
                                         )
+                                    logger.info(f"Insufficient local valid history ({len(valid_dc_msg_ids)}/{history_limit}). Triggering Telegram fetch for {tg_target}...")
+                                    # Joins during startup are fetched once the bridge is up instead of dropped
+                                    if startup.when_bridge_ready(f"history:{chat_id}", fetch):
+                                        # Record sync attempt before starting async task to prevent overlaps
+                                        last_resend_times[chat_id] = current_time
                                         return
-                                    else:
-                                        logger.warning(f"Could not determine Telegram target for chat {chat_id}")
-                                elif not (bridge and bridge.loop):
-                                    logger.warning("Telegram bridge loop not ready yet, cannot fetch history.")
-                                elif not channel_cfg:
+                                    logger.warning("Telegram bridge is not running, cannot fetch history.")
+                                elif channel_cfg:
+                                    logger.warning(f"Could not determine Telegram target for chat {chat_id}")
+                                else:
                                     logger.warning(f"No channel configuration found for chat {chat_id}")
 
                             if valid_dc_msg_ids:
                                 logger.info(f"Resending {len(valid_dc_msg_ids)} existing messages to channel {chat_id}...")
                                 bot.rpc.resend_messages(accid, valid_dc_msg_ids)
+                                metrics.inc("bridge_history_resent_total", len(valid_dc_msg_ids), channel=chat_id)
+                                if events_enabled():
+                                    log_event("resend", source=kind, dc_chat=chat_id, dc_msg_ids=valid_dc_msg_ids)
                                 last_resend_times[chat_id] = current_time
                                 logger.info("History resend complete.")
                             else:
@@ -310,325 +506,440 @@ def run_bot(rpc: Rpc, hooks: HookCollection):
             except Exception as e:
                 logger.debug(f"Could not accept/mark noticed chat {chat_id}: {e}")
 
-        # Handle leave events
-        leave_events = ("MemberRemoved", "ChatModified")
-        if kind in leave_events:
-            try:
-                contacts = bot.rpc.get_chat_contacts(accid, chat_id)
-                if not contacts:
-                    logger.info(f"No recipients left in channel {chat_id}. Disabling relay.")
-                    chan_repo.update_enabled(accid, chat_id, False)
-                else:
-                    # If we have members now, but it was disabled? 
-                    # Might be better to check status if contacts exist.
-                    chan = chan_repo.get_by_chat_id(accid, chat_id)
-                    if chan and not chan.enabled:
-                        logger.info(f"Recipients detected in channel {chat_id}, re-enabling relay.")
-                        chan_repo.update_enabled(accid, chat_id, True)
-            except Exception as e:
-                logger.debug(f"Error checking recipients for chat {chat_id}: {e}")
+        # Handle leave events; the enable/disable decision is debounced per chat
+        if kind == "MemberRemoved":
+            membership.member_removed(accid, chat_id, event.get("contact_id"))
+        elif kind == "ChatModified":
+            membership.chat_modified(accid, chat_id)
 
 
-    @hooks.on(events.NewMessage)
-    def handle_msg(bot, accid, event):
-        msg = event.msg
-        
-        # 1. Check if it's a command/password in a 1-on-1 chat or similar
-        # We can check if the chat is NOT one of the mirrored channels
-        if msg.chat_id not in channel_ids:
-            text = msg.text.strip() if msg.text else ""
-            
-            # Check if it's the admin password
-            if admin_password and text == admin_password:
-                admin_repo.add_admin(msg.from_id)
-                bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="Authentication successful! You are now an admin.\nCommands:\n/links - Get channel invite links\n/add CHANNEL_ID - Add a new channel to mirror"))
-                return
+    # Admin commands: handler(bot, accid, msg, text), run on the command pool
+    def cmd_help(bot, accid, msg, text):
+        help_text = (
+            "Available Admin Commands:\n\n"
+            "/help - Show this help message\n"
+            "/links [PAGE] [NO_PHOTO|NO_VIDEO|DISABLED] [NAME] - List mirrored channels with their DC Chat IDs and invite links, "
+            "a page at a time, optionally filtered by status or name. Add REFRESH to fetch the invite links again\n"
+            "/add CHANNEL_ID [NO_PHOTO] [NO_VIDEO] - Add a new Telegram channel to mirror. "
+            "CHANNEL_ID can be a username (@channel), tgid (-100...), or private invite link (https://t.me/+...)\n"
+            "/link CHAT_ID [NO_PHOTO] [NO_VIDEO] - Update media settings for an existing channel. "
+            "CHAT_ID is the Delta Chat ID from /links\n"
+            "/photo CHAT_ID on|off - Enable or disable photo relaying for a channel\n"
+            "/video CHAT_ID on|off - Enable or disable video relaying for a channel\n"
+            "/addmany CHANNEL_ID [CHANNEL_ID ...] - Add many channels at once, separated by spaces or one per line "
+            "(a line may end with NO_PHOTO/NO_VIDEO); replies with one summary of invite links and errors\n"
+            "/delete CHAT_ID - Remove a channel from the mirror list and stop mirroring\n"
+            "/reload - Re-read config.yml and apply changes to channels_to_mirror without restarting\n"
+            "/stats - Show relay latency statistics per channel\n"
+            "/profile start|stop - Profile the Telegram and Delta Chat threads; stop reports the hottest functions\n"
+            "/tasks - List pending asyncio tasks of the Telegram bridge"
+        )
+        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=help_text))
 
-            # Check if user is admin
-            if admin_repo.is_admin(msg.from_id):
-                if text == "/help":
-                    help_text = (
-                        "Available Admin Commands:\n\n"
-                        "/help - Show this help message\n"
-                        "/links - List all active mirrored channels with their DC Chat IDs and invite links\n"
-                        "/add CHANNEL_ID [NO_PHOTO] [NO_VIDEO] - Add a new Telegram channel to mirror. "
-                        "CHANNEL_ID can be a username (@channel), tgid (-100...), or private invite link (https://t.me/+...)\n"
-                        "/link CHAT_ID [NO_PHOTO] [NO_VIDEO] - Update media settings for an existing channel. "
-                        "CHAT_ID is the Delta Chat ID from /links\n"
-                        "/photo CHAT_ID on|off - Enable or disable photo relaying for a channel\n"
-                        "/video CHAT_ID on|off - Enable or disable video relaying for a channel\n"
-                        "/delete CHAT_ID - Remove a channel from the mirror list and stop mirroring"
-                    )
-                    bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=help_text))
-                    return
+    def cmd_stats(bot, accid, msg, text):
+        bridge = bridge_container.get('bridge')
+        if not bridge:
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="Telegram bridge not ready yet."))
+            return
+        counts = bridge.update_counts
+        response = (
+            f"Telegram updates handled: {counts['handled']}, dropped: {counts['dropped']}\n\n"
+            f"{bridge.stats.format_summary()}"
+        )
+        if retention:
+            response += f"\n\n{retention.format_size_history()}"
+        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=response))
 
-                if text == "/links":
-                    # Get all active channels and their links
-                    response = "Active Channels:\n"
-                    # Combine memory state to be sure we show everything currently being mirrored
-                    if not channel_ids:
-                        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="No channels configured."))
-                        return
+    def cmd_profile(bot, accid, msg, text):
+        parts = text.split()
+        action = parts[1].lower() if len(parts) > 1 else ""
+        if action not in ("start", "stop"):
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="Usage: /profile start|stop"))
+            return
+        bridge = bridge_container.get('bridge')
+        try:
+            if action == "start":
+                # Runs on a pool worker; sample the hook thread that queued it
+                response = profiler.start(bridge, dc_thread=hook_thread.get("ident"))
+            else:
+                response = profiler.stop()
+        except Exception as e:
+            response = f"Profiler error: {e}"
+        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=response))
 
-                    for cid in channel_ids:
-                        cfg = chat_id_to_cfg.get(cid)
-                        chan = chan_repo.get_by_chat_id(accid, cid)
-                        name = (chan.name if chan else cfg.get("name")) or "Unknown"
-                        qrdata = bot.rpc.get_chat_securejoin_qr_code(accid, cid)
-                        
-                        status = []
-                        if chan:
-                            if not chan.photo_enabled: status.append("NO_PHOTO")
-                            if not chan.video_enabled: status.append("NO_VIDEO")
-                        elif cfg:
-                             if not cfg.get("photo", {}).get("enable", True): status.append("NO_PHOTO")
-                             if not cfg.get("video", {}).get("enable", True): status.append("NO_VIDEO")
-                        
-                        status_str = f" [{', '.join(status)}]" if status else ""
-                        response += f"- {name}\n  DC Chat ID: {cid}{status_str}\n  Link: {qrdata}\n"
-                    bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=response))
-                    return
+    def cmd_reload(bot, accid, msg, text):
+        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="Reloading channels_to_mirror..."))
+        reload_channels(lambda response: bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=response)))
 
-                elif text.startswith("/link"):
-                    parts = text.split()
-                    if len(parts) < 2:
-                        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="Usage: /link CHAT_ID [NO_PHOTO] [NO_VIDEO]"))
-                        return
-                    
-                    target_id_str = parts[1]
-                    no_photo = "NO_PHOTO" in [p.upper() for p in parts]
-                    no_video = "NO_VIDEO" in [p.upper() for p in parts]
-                    
-                    try:
-                        target_id = int(target_id_str)
-                    except ValueError:
-                        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="CHAT_ID must be a number."))
-                        return
+    def cmd_tasks(bot, accid, msg, text):
+        bridge = bridge_container.get('bridge')
+        if not (bridge and bridge.loop):
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="Telegram bridge not ready yet."))
+            return
+        try:
+            response = describe_tasks(bridge)
+        except Exception as e:
+            response = f"Could not list tasks: {e}"
+        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=response))
 
-                    # Find channel in DB
-                    chan = chan_repo.get_by_chat_id(accid, target_id)
-                    if not chan:
-                        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Channel {target_id} not found. Use DC Chat ID from /links."))
-                        return
-                    
-                    # Update DB
-                    chan.photo_enabled = not no_photo
-                    chan.video_enabled = not no_video
-                    chan_repo.save(chan)
-                    
-                    # Update config.yml for persistence
-                    full_config = load_config()
-                    for c_cfg in full_config.get("channels_to_mirror", []):
-                        if c_cfg.get("chat_id") == chan.chat_id:
-                            if "photo" not in c_cfg: c_cfg["photo"] = {}
-                            if "video" not in c_cfg: c_cfg["video"] = {}
-                            c_cfg["photo"]["enable"] = not no_photo
-                            c_cfg["video"]["enable"] = not no_video
-                            break
-                    save_config(full_config)
-                    
-                    bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Settings updated for {chan.name}:\nPhoto: {'Enabled' if not no_photo else 'Disabled'}\nVideo: {'Enabled' if not no_video else 'Disabled'}"))
-                    return
+    def cmd_links(bot, accid, msg, text):
+        if not channel_ids:
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="No channels configured."))
+            return
 
-                elif text.startswith("/photo") or text.startswith("/video"):
-                    is_photo = text.startswith("/photo")
-                    parts = text.split()
-                    if len(parts) < 3:
-                        cmd = "/photo" if is_photo else "/video"
-                        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Usage: {cmd} CHAT_ID on|off"))
-                        return
-                    
-                    target_id_str = parts[1]
-                    action = parts[2].lower()
-                    if action not in ["on", "off"]:
-                        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="Action must be 'on' or 'off'."))
-                        return
-                    
-                    enable = (action == "on")
-                    
+        # /links [PAGE] [NO_PHOTO|NO_VIDEO|DISABLED ...] [NAME WORDS ...] [REFRESH]
+        page, statuses, words, refresh = 1, set(), [], False
+        for token in text.split()[1:]:
+            if token.isdigit():
+                page = max(1, int(token))
+            elif token.upper() in ("NO_PHOTO", "NO_VIDEO", "DISABLED"):
+                statuses.add(token.upper())
+            elif token.upper() == "REFRESH":
+                refresh = True
+            else:
+                words.append(token.lower())
+
+        # One query for all rows; invite links come from their cached column
+        stored = {c.chat_id: c for c in chan_repo.get_by_accid(accid)}
+        matches = []
+        for cid in channel_ids:
+            cfg = chat_id_to_cfg.get(cid) or {}
+            chan = stored.get(cid)
+            name = (chan.name if chan else cfg.get("name")) or "Unknown"
+
+            status = []
+            if chan:
+                if not chan.photo_enabled: status.append("NO_PHOTO")
+                if not chan.video_enabled: status.append("NO_VIDEO")
+                if not chan.enabled: status.append("DISABLED")
+            else:
+                if not cfg.get("photo", {}).get("enable", True): status.append("NO_PHOTO")
+                if not cfg.get("video", {}).get("enable", True): status.append("NO_VIDEO")
+
+            if not statuses.issubset(status) or not all(w in name.lower() for w in words):
+                continue
+            matches.append((chan or Channel(accid=accid, chat_id=cid, name=name), status))
+
+        if not matches:
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="No channels match."))
+            return
+        pages = (len(matches) + links_page_size - 1) // links_page_size
+        page = min(page, pages)
+        start = (page - 1) * links_page_size
+        shown = matches[start:start + links_page_size]
+        links = invite_links(bot.rpc, chan_repo, accid, [chan for chan, _ in shown], refresh=refresh)
+
+        response = f"Channels {start + 1}-{start + len(shown)} of {len(matches)} (page {page}/{pages}):\n"
+        for chan, status in shown:
+            status_str = f" [{', '.join(status)}]" if status else ""
+            response += f"- {chan.name}\n  DC Chat ID: {chan.chat_id}{status_str}\n  Link: {links.get(chan.chat_id, 'unavailable')}\n"
+        if page < pages:
+            filters = " ".join(sorted(statuses) + words)
+            response += f"\nNext page: /links {page + 1}{' ' + filters if filters else ''}"
+        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=response))
+
+    def cmd_link(bot, accid, msg, text):
+        parts = text.split()
+        if len(parts) < 2:
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="Usage: /link CHAT_ID [NO_PHOTO] [NO_VIDEO]"))
+            return
+
+        target_id_str = parts[1]
+        no_photo = "NO_PHOTO" in [p.upper() for p in parts]
+        no_video = "NO_VIDEO" in [p.upper() for p in parts]
+
+        try:
+            target_id = int(target_id_str)
+        except ValueError:
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="CHAT_ID must be a number."))
+            return
+
+        # Find channel in DB
+        chan = chan_repo.get_by_chat_id(accid, target_id)
+        if not chan:
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Channel {target_id} not found. Use DC Chat ID from /links."))
+            return
+
+        # Update DB
+        chan = replace(chan, photo_enabled=not no_photo, video_enabled=not no_video)
+        chan_repo.save(chan)
+
+        # Update config.yml for persistence
+        with config_store.edit() as full_config:
+            for c_cfg in full_config.get("channels_to_mirror", []):
+                if c_cfg.get("chat_id") == chan.chat_id:
+                    if "photo" not in c_cfg: c_cfg["photo"] = {}
+                    if "video" not in c_cfg: c_cfg["video"] = {}
+                    c_cfg["photo"]["enable"] = not no_photo
+                    c_cfg["video"]["enable"] = not no_video
+                    break
+
+        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Settings updated for {chan.name}:\nPhoto: {'Enabled' if not no_photo else 'Disabled'}\nVideo: {'Enabled' if not no_video else 'Disabled'}"))
+
+    def cmd_media(bot, accid, msg, text):
+        is_photo = text.split()[0].lower() == "/photo"
+        parts = text.split()
+        if len(parts) < 3:
+            cmd = "/photo" if is_photo else "/video"
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Usage: {cmd} CHAT_ID on|off"))
+            return
+
+        target_id_str = parts[1]
+        action = parts[2].lower()
+        if action not in ["on", "off"]:
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="Action must be 'on' or 'off'."))
+            return
+
+        enable = (action == "on")
+
+        try:
+            target_id = int(target_id_str)
+        except ValueError:
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="CHAT_ID must be a number."))
+            return
+
+        # Find channel in DB
+        chan = chan_repo.get_by_chat_id(accid, target_id)
+        if not chan:
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Channel {target_id} not found in database."))
+            return
+
+        if is_photo:
+            chan = replace(chan, photo_enabled=enable)
+        else:
+            chan = replace(chan, video_enabled=enable)
+
+        chan_repo.save(chan)
+
+        # Update config.yml for persistence
+        with config_store.edit() as full_config:
+            for c_cfg in full_config.get("channels_to_mirror", []):
+                if c_cfg.get("chat_id") == chan.chat_id:
+                    key = "photo" if is_photo else "video"
+                    if key not in c_cfg: c_cfg[key] = {}
+                    c_cfg[key]["enable"] = enable
+                    break
+
+        media_type = "Photo" if is_photo else "Video"
+        status = "enabled" if enable else "disabled"
+        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"{media_type} relaying {status} for channel {chan.name} (ID: {chan.chat_id})."))
+
+    def cmd_delete(bot, accid, msg, text):
+        parts = text.split()
+        if len(parts) < 2:
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="Usage: /delete CHAT_ID"))
+            return
+
+        target_id = parts[1]
+        try:
+            target_id = int(target_id)
+        except:
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="CHAT_ID must be a number."))
+            return
+
+        # 1. Update memory
+        found = False
+        if target_id in channel_ids:
+            channel_ids.remove(target_id)
+            found = True
+        if target_id in chat_id_to_cfg:
+            del chat_id_to_cfg[target_id]
+            found = True
+
+        if not found:
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Channel {target_id} not found in current session."))
+            return
+
+        # 2. Update config.yml
+        with config_store.edit() as full_config:
+            full_config["channels_to_mirror"] = [c for c in full_config.get("channels_to_mirror", []) if c.get("chat_id") != target_id]
+
+        # 3. Update DB
+        chan_repo.delete(accid, target_id)
+        membership.forget(target_id)
+
+        # 4. Update bridge
+        bridge = bridge_container.get('bridge')
+        if bridge and hasattr(bridge, 'remove_dynamic_channel'):
+            asyncio.run_coroutine_threadsafe(bridge.remove_dynamic_channel(target_id), bridge.loop)
+
+        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Channel {target_id} deleted and mirroring stopped."))
+
+    def cmd_addmany(bot, accid, msg, text):
+        items = parse_targets(text[len("/addmany"):])
+        if not items:
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="Usage: /addmany CHANNEL_ID [CHANNEL_ID ...], one line per channel with optional NO_PHOTO/NO_VIDEO"))
+            return
+        bridge = bridge_container.get('bridge')
+        if not (bridge and bridge.loop):
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="Telegram bridge not ready yet."))
+            return
+        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Importing {len(items)} channels... Please wait."))
+
+        async def do_import():
+            try:
+                created = await import_channels(bridge, chan_repo, accid, items, bulk_concurrency)
+                for item in created:
+                    channel_ids.append(item.chat_id)
+                    chat_id_to_cfg[item.chat_id] = item.entry
+                bridge.register_channels([(item.tg_id, item.entry) for item in created])
+                bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=format_summary(items)))
+            except Exception as e:
+                bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Bulk import failed: {e}"))
+
+        asyncio.run_coroutine_threadsafe(do_import(), bridge.loop)
+
+    def cmd_add(bot, accid, msg, text):
+        parts = text.split()
+        if len(parts) < 2:
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="Usage: /add CHANNEL_ID [NO_PHOTO] [NO_VIDEO]"))
+            return
+
+        tg_target = parts[1]
+        no_photo = "NO_PHOTO" in [p.upper() for p in parts]
+        no_video = "NO_VIDEO" in [p.upper() for p in parts]
+
+        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Adding channel {tg_target}... Please wait."))
+
+        bridge = bridge_container.get('bridge')
+        if bridge and bridge.loop:
+            async def do_add():
+                try:
+                    # Resolve and Join TG entity via bridge helper
                     try:
-                        target_id = int(target_id_str)
-                    except ValueError:
-                        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="CHAT_ID must be a number."))
-                        return
+                        tg_id = await bridge._resolve_and_join_channel(target_config(tg_target), accid)
+                        if not tg_id:
+                            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Error: Could not resolve or join Telegram channel '{tg_target}'. Ensure the bot has access or the invite link is valid."))
+                            return
 
-                    # Find channel in DB
-                    chan = chan_repo.get_by_chat_id(accid, target_id)
-                    if not chan:
-                        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Channel {target_id} not found in database."))
+                        # Now get the details from the resolved entity
+                        entity = await bridge.client.get_entity(tg_id)
+                        tg_name = getattr(entity, 'title', 'New Channel')
+                        tg_username = getattr(entity, 'username', None)
+                    except Exception as e:
+                        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Error resolving Telegram channel: {e}"))
                         return
-                    
-                    if is_photo:
-                        chan.photo_enabled = enable
-                    else:
-                        chan.video_enabled = enable
-                    
-                    chan_repo.save(chan)
-                    
-                    # Update config.yml for persistence
-                    full_config = load_config()
-                    for c_cfg in full_config.get("channels_to_mirror", []):
-                        if c_cfg.get("chat_id") == chan.chat_id:
-                            key = "photo" if is_photo else "video"
-                            if key not in c_cfg: c_cfg[key] = {}
-                            c_cfg[key]["enable"] = enable
-                            break
-                    save_config(full_config)
-                    
-                    media_type = "Photo" if is_photo else "Video"
-                    status = "enabled" if enable else "disabled"
-                    bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"{media_type} relaying {status} for channel {chan.name} (ID: {chan.chat_id})."))
-                    return
 
-                elif text.startswith("/delete"):
-                    parts = text.split()
-                    if len(parts) < 2:
-                        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="Usage: /delete CHAT_ID"))
-                        return
-                    
-                    target_id = parts[1]
+                    # Create DC Channel
+                    dc_chat_id = bot.rpc.create_broadcast(accid, tg_name)
                     try:
-                        target_id = int(target_id)
+                        bot.rpc.set_chat_visibility(accid, dc_chat_id, "Normal")
                     except:
-                        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="CHAT_ID must be a number."))
-                        return
+                        pass
 
-                    # 1. Update memory
-                    found = False
-                    if target_id in channel_ids:
-                        channel_ids.remove(target_id)
-                        found = True
-                    if target_id in chat_id_to_cfg:
-                        del chat_id_to_cfg[target_id]
-                        found = True
-                    
-                    if not found:
-                        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Channel {target_id} not found in current session."))
+                    # Update config
+                    mirror_entry = {
+                        "tgid": tg_id,
+                        "username": tg_username or tg_target,
+                        "chat_id": dc_chat_id,
+                        "name": tg_name,
+                        "photo": {"enable": not no_photo},
+                        "video": {"enable": not no_video}
+                    }
+                    with config_store.edit() as full_config:
+                        mirrored = full_config.setdefault("channels_to_mirror", [])
+                        # Check if already exists (tgid or username)
+                        already_mirrored = any(
+                            c.get("tgid") == tg_id or (tg_username and c.get("username") == tg_username)
+                            for c in mirrored
+                        )
+                        if not already_mirrored:
+                            mirrored.append(mirror_entry)
+                    if already_mirrored:
+                        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Channel {tg_target} is already mirrored."))
                         return
 
-                    # 2. Update config.yml
-                    full_config = load_config()
-                    full_config["channels_to_mirror"] = [c for c in full_config.get("channels_to_mirror", []) if c.get("chat_id") != target_id]
-                    save_config(full_config)
-                    
-                    # 3. Update DB
-                    chan_repo.delete(accid, target_id)
-                    
-                    # 4. Update bridge
-                    bridge = bridge_container.get('bridge')
-                    if bridge and hasattr(bridge, 'remove_dynamic_channel'):
-                        asyncio.run_coroutine_threadsafe(bridge.remove_dynamic_channel(target_id), bridge.loop)
-                    
-                    bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Channel {target_id} deleted and mirroring stopped."))
-                    return
+                    # Update repository
+                    chan_repo.save(Channel(
+                        accid=accid,
+                        chat_id=dc_chat_id,
+                        name=tg_name,
+                        link=tg_target if is_invite_link(tg_target) else None,
+                        photo_enabled=not no_photo,
+                        video_enabled=not no_video
+                    ))
 
-                elif text.startswith("/add"):
-                    parts = text.split()
-                    if len(parts) < 2:
-                        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="Usage: /add CHANNEL_ID [NO_PHOTO] [NO_VIDEO]"))
-                        return
-                    
-                    tg_target = parts[1]
-                    no_photo = "NO_PHOTO" in [p.upper() for p in parts]
-                    no_video = "NO_VIDEO" in [p.upper() for p in parts]
+                    # Update local runtime state
+                    nonlocal channel_ids, chat_id_to_cfg
+                    channel_ids.append(dc_chat_id)
+                    chat_id_to_cfg[dc_chat_id] = mirror_entry
 
-                    bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Adding channel {tg_target}... Please wait."))
-                    
-                    bridge = bridge_container.get('bridge')
-                    if bridge and bridge.loop:
-                        async def do_add():
-                            try:
-                                # Resolve and Join TG entity via bridge helper
-                                try:
-                                    # Create a temporary config for resolution
-                                    tmp_cfg = {}
-                                    if any(domain in tg_target for domain in ["t.me/", "telegram.me/", "telegram.dog/"]) or "+" in tg_target:
-                                        tmp_cfg["username"] = tg_target
-                                    elif tg_target.startswith('-') or tg_target.isdigit():
-                                        tmp_cfg["tgid"] = tg_target
-                                    else:
-                                        tmp_cfg["username"] = tg_target
+                    # Tell bridge to sync and start listening
+                    if hasattr(bridge, 'add_dynamic_channel'):
+                        await bridge.add_dynamic_channel(mirror_entry, accid)
+                    else:
+                        await bridge._resolve_and_join_channel(mirror_entry, accid, sync_info_now=True)
 
-                                    tg_id = await bridge._resolve_and_join_channel(tmp_cfg, accid)
-                                    if not tg_id:
-                                        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Error: Could not resolve or join Telegram channel '{tg_target}'. Ensure the bot has access or the invite link is valid."))
-                                        return
-                                    
-                                    # Now get the details from the resolved entity
-                                    entity = await bridge.client.get_entity(tg_id)
-                                    tg_name = getattr(entity, 'title', 'New Channel')
-                                    tg_username = getattr(entity, 'username', None)
-                                except Exception as e:
-                                    bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Error resolving Telegram channel: {e}"))
-                                    return
-
-                                # Create DC Channel
-                                dc_chat_id = bot.rpc.create_broadcast(accid, tg_name)
-                                try:
-                                    bot.rpc.set_chat_visibility(accid, dc_chat_id, "Normal")
-                                except:
-                                    pass
-                                
-                                # Update config
-                                full_config = load_config()
-                                if "channels_to_mirror" not in full_config:
-                                    full_config["channels_to_mirror"] = []
-                                
-                                # Check if already exists (tgid or username)
-                                for c in full_config["channels_to_mirror"]:
-                                    if c.get("tgid") == tg_id or (tg_username and c.get("username") == tg_username):
-                                        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Channel {tg_target} is already mirrored."))
-                                        return
+                    qrdata = invite_links(bot.rpc, chan_repo, accid, [chan_repo.get_by_chat_id(accid, dc_chat_id)]).get(dc_chat_id)
+                    bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Success! Channel {tg_name} added.\nTG ID: {tg_id}\nDC Chat ID: {dc_chat_id}\nInvite Link:\n{qrdata}"))
 
-                                mirror_entry = {
-                                    "tgid": tg_id,
-                                    "username": tg_username or tg_target,
-                                    "chat_id": dc_chat_id,
-                                    "name": tg_name,
-                                    "photo": {"enable": not no_photo},
-                                    "video": {"enable": not no_video}
-                                }
-                                full_config["channels_to_mirror"].append(mirror_entry)
-                                save_config(full_config)
-                                
-                                # Update repository
-                                chan_repo.save(Channel(
-                                    accid=accid,
-                                    chat_id=dc_chat_id,
-                                    name=tg_name,
-                                    link=tg_target if ("+" in tg_target or "joinchat" in tg_target) else None,
-                                    photo_enabled=not no_photo,
-                                    video_enabled=not no_video
-                                ))
-                                
-                                # Update local runtime state
-                                nonlocal channel_ids, chat_id_to_cfg
-                                channel_ids.append(dc_chat_id)
-                                chat_id_to_cfg[dc_chat_id] = mirror_entry
-                                
-                                # Tell bridge to sync and start listening
-                                if hasattr(bridge, 'add_dynamic_channel'):
-                                    await bridge.add_dynamic_channel(mirror_entry, accid)
-                                else:
-                                    await bridge._resolve_and_join_channel(mirror_entry, accid, sync_info_now=True)
-                                
-                                qrdata = bot.rpc.get_chat_securejoin_qr_code(accid, dc_chat_id)
-                                bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Success! Channel {tg_name} added.\nTG ID: {tg_id}\nDC Chat ID: {dc_chat_id}\nInvite Link:\n{qrdata}"))
-                                
-                            except Exception as e:
-                                bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Failed to add channel: {e}"))
-                        
-                        asyncio.run_coroutine_threadsafe(do_add(), bridge.loop)
-                    else:
-                        bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="Telegram bridge not ready yet."))
+                except Exception as e:
+                    bot.rpc.send_msg(accid, msg.chat_id, MsgData(text=f"Failed to add channel: {e}"))
+
+            asyncio.run_coroutine_threadsafe(do_add(), bridge.loop)
+        else:
+            bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="Telegram bridge not ready yet."))
+
+    admin_commands = {
+        "/help": cmd_help,
+        "/stats": cmd_stats,
+        "/profile": cmd_profile,
+        "/reload": cmd_reload,
+        "/tasks": cmd_tasks,
+        "/links": cmd_links,
+        "/link": cmd_link,
+        "/photo": cmd_media,
+        "/video": cmd_media,
+        "/delete": cmd_delete,
+        "/addmany": cmd_addmany,
+        "/add": cmd_add,
+    }
+
+    @hooks.on(events.NewMessage)
+    def handle_msg(bot, accid, event):
+        msg = event.msg
+        hook_thread["ident"] = get_ident()
+        
+        # 1. Check if it's a command/password in a 1-on-1 chat or similar
+        # We can check if the chat is NOT one of the mirrored channels
+        if msg.chat_id not in channel_ids:
+            # Inbox floods are mostly non-admins: reject them with a set lookup and
+            # a substring check before touching the text any further
+            is_admin = admin_repo.is_admin(msg.from_id)
+            if not is_admin and not (admin_password and msg.text and admin_password in msg.text):
+                logger.debug("Ignoring message from %s in chat %s (not a broadcast channel and not authorized)", msg.from_id, msg.chat_id)
+                return
+            text = msg.text.strip() if msg.text else ""
+            
+            # Check if it's the admin password
+            if admin_password and text == admin_password:
+                admin_repo.add_admin(msg.from_id)
+                bot.rpc.send_msg(accid, msg.chat_id, MsgData(text="Authentication successful! You are now an admin.\nCommands:\n/links - Get channel invite links\n/add CHANNEL_ID - Add a new channel to mirror"))
+                return
+
+            # Check if user is admin
+            if is_admin:
+                name = text.split(None, 1)[0].lower() if text else ""
+                handler = admin_commands.get(name)
+                if handler:
+                    # Commands of one admin always go to the same worker, so they run in order
+                    command_pool.submit(msg.from_id, handler, bot, accid, msg, text)
                     return
 
             # If not admin and not password, just ignore or log
-            logger.debug(f"Ignoring message from {msg.from_id} in chat {msg.chat_id} (not a broadcast channel and not authorized)")
+            logger.debug("Ignoring message from %s in chat %s (not a broadcast channel and not authorized)", msg.from_id, msg.chat_id)
             return
 
+        # Info messages name the subscriber who joined or left
+        contact_id = getattr(msg, "info_contact_id", None)
+        system_type = getattr(msg, "system_message_type", None)
+        if contact_id and system_type == "MemberAddedToGroup":
+            membership.member_added(accid, msg.chat_id, contact_id)
+        elif contact_id and system_type == "MemberRemovedFromGroup":
+            membership.member_removed(accid, msg.chat_id, contact_id)
+
         msg_type = "System" if msg.is_system else "Text"
-        logger.info(f"[acc={accid}] {msg_type} Message in chat {msg.chat_id}: {msg.text!r}")
+        logger.info("[acc=%s] %s Message in chat %s: %r", accid, msg_type, msg.chat_id, msg.text)
         
     accounts = rpc.get_all_account_ids()
     if not accounts:
@@ -646,39 +957,116 @@ def run_bot(rpc: Rpc, hooks: HookCollection):
     if proxy_cfg:
         apply_dc_proxy_config(rpc, acc_to_run, proxy_cfg)
 
-    # Ensure all configured channels are in the DB
-    for cfg in channels_to_mirror:
-        cid = cfg.get("chat_id")
-        if cid:
-            if not chan_repo.get_by_chat_id(acc_to_run, cid):
-                chan_repo.save(Channel(
-                    accid=acc_to_run,
-                    chat_id=cid,
-                    name=cfg.get("name", "Unknown"),
-                    photo_enabled=cfg.get("photo", {}).get("enable", True),
-                    video_enabled=cfg.get("video", {}).get("enable", True)
-                ))
-
     logger.info(f"Starting bot for account: {acc_to_run} (Listening on {len(channel_ids)} channels)")
     
-    # Start Telegram Bridge in a separate thread, sharing the same RPC instance
+    store_cfg = config.get("config_store", {})
+    config_store.write_delay = store_cfg.get("write_delay", 1.0)
+    config_store.max_write_delay = store_cfg.get("max_write_delay", 10.0)
+
+    metrics_cfg = config.get("metrics", {})
+    if metrics_cfg.get("enabled", False):
+        try:
+            start_metrics_server(metrics_cfg.get("host", "127.0.0.1"), metrics_cfg.get("port", 9464))
+            track_telethon_reconnects()
+        except OSError as e:
+            logger.error(f"Could not start metrics endpoint: {e}")
+
+    # Start Telegram Bridge in a separate thread, sharing the same RPC instance.
+    # It connects while the rest of startup runs and waits for the DB sync
+    # below before it starts relaying.
     bridge_container = {}
-    t_thread = Thread(target=start_telegram_bridge, args=(config, rpc, msg_repo, chan_repo, bridge_container), daemon=True)
+    t_thread = Thread(target=start_telegram_bridge, args=(config, rpc, msg_repo, chan_repo, bridge_container, capture_file),
+                      kwargs={"startup": startup}, daemon=True)
     t_thread.start()
 
+    # External edits picked up by the config watcher are applied like a reload;
+    # subscribed only now because reload_channels uses bridge_container and acc_to_run
+    config_store.subscribe(lambda _: reload_channels(from_disk=False))
+    if store_cfg.get("watch", False):
+        config_store.start_watch(store_cfg.get("watch_interval", 2.0))
+
+    # Ensure all configured channels are in the DB, in one transaction
+    stored = {c.chat_id for c in chan_repo.get_by_accid(acc_to_run)}
+    chan_repo.save_many([
+        Channel(
+            accid=acc_to_run,
+            chat_id=cfg["chat_id"],
+            name=cfg.get("name", "Unknown"),
+            photo_enabled=cfg.get("photo", {}).get("enable", True),
+            video_enabled=cfg.get("video", {}).get("enable", True)
+        )
+        for cfg in channels_to_mirror if cfg.get("chat_id") and cfg["chat_id"] not in stored
+    ])
+    startup.ready("db")
+
     bot = Bot(rpc, hooks, logger)
-    
-    for channel_cfg in channels_to_mirror:
-        chat_id = channel_cfg.get("chat_id")
-        if chat_id and channel_cfg.get("send_start", False):
-            try:
-                logger.info(f"Sending 'start' message to channel {chat_id}...")
-                bot.rpc.send_msg(acc_to_run, chat_id, MsgData(text="start"))
-            except Exception as e:
-                logger.warning(f"Could not send startup message for {chat_id}: {e}")
 
+    if hasattr(signal, "SIGHUP"):
+        # Applied off the signal handler so config and DB locks are never re-entered
+        signal.signal(signal.SIGHUP, lambda sig, frame: Thread(target=reload_channels, name="config-reload", daemon=True).start())
+
+    def send_start_messages():
+        for channel_cfg in config_store.channels():
+            chat_id = channel_cfg.get("chat_id")
+            if chat_id and channel_cfg.get("send_start", False):
+                try:
+                    logger.info(f"Sending 'start' message to channel {chat_id}...")
+                    bot.rpc.send_msg(acc_to_run, chat_id, MsgData(text="start"))
+                except Exception as e:
+                    logger.warning(f"Could not send startup message for {chat_id}: {e}")
+
+    # Sent alongside the event loop instead of holding it up
+    Thread(target=send_start_messages, name="start-messages", daemon=True).start()
+
+    startup.ready("dc")
     bot.run_forever(acc_to_run)
 
+def replay_speed(value: str) -> float:
+    """argparse type of --speed: a positive factor, or "max" (0) for no pacing."""
+    if value == "max":
+        return 0.0
+    try:
+        speed = float(value)
+    except ValueError:
+        speed = None
+    if speed is None or not 0 < speed < float("inf"):
+        raise argparse.ArgumentTypeError(f"invalid speed {value!r}: expected a positive number or 'max'")
+    return speed
+
+def run_replay(config: dict, recording: str, speed: float, rpc_latency_ms: float = 0.0):
+    """Feed a capture file through the relay pipeline against a stubbed RPC."""
+    import asyncio
+    import tempfile
+    from repository.message_repository import MessageRepository
+    from telegram_bridge import TelegramBridge
+    from capture import load_recording, replay_recording, ReplayRpc
+
+    records = load_recording(recording)
+    if not records:
+        logger.error(f"No updates found in {recording}")
+        return
+
+    # Replay never touches the real database
+    db_path = "data/replay.sqlite"
+    Path(db_path).unlink(missing_ok=True)
+    init_db(db_path)
+    msg_repo = MessageRepository(db_path)
+    chan_repo = ChannelRepository(db_path)
+
+    bridge = TelegramBridge(config, ReplayRpc(latency=rpc_latency_ms / 1000), msg_repo, chan_repo)
+    # Keep per-channel settings for recorded chats that are configured
+    for cfg in bridge.channels_to_mirror:
+        if cfg.get("tgid") and cfg.get("chat_id"):
+            bridge.tg_to_dc_map[cfg["tgid"]] = cfg
+            bridge.target_chats.add(cfg["tgid"])
+
+    logger.info(f"Replaying {len(records)} updates from {recording} at {f'{speed:g}x' if speed else 'max'} speed...")
+    # Placeholder media only lives as long as the replay
+    with tempfile.TemporaryDirectory(prefix="replay_media_") as media_dir:
+        bridge.media_dir = Path(media_dir)
+        asyncio.run(replay_recording(bridge, records, speed=speed, accid=config.get("active_accid") or 1))
+    logger.info(f"Relay latency summary:\n{bridge.stats.format_summary()}")
+
 def main():
     def signal_handler(sig, frame):
         logger.info("Shutdown signal received. Closing...")
@@ -692,13 +1080,26 @@ def main():
     parser.add_argument("--link", action="store_true", help="Show invite link and setup channel")
     parser.add_argument("--run", action="store_true", help="Run the bot")
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
+    parser.add_argument("--import", dest="import_file", metavar="FILE", help="Add the Telegram channels listed in FILE (one per line) while the bot is stopped")
+    parser.add_argument("--capture", metavar="FILE", help="With --run: record incoming Telegram updates to FILE (JSONL)")
+    parser.add_argument("--replay", metavar="FILE", help="Replay a capture file through the relay pipeline against a stub RPC")
+    parser.add_argument("--speed", type=replay_speed, default=1.0, help="Replay speed: 1, 10, 0.5, ... or max")
+    parser.add_argument("--rpc-latency-ms", type=float, default=0.0, help="Simulated Delta Chat RPC latency during replay")
     
     args = parser.parse_args()
-    
+    if not (args.init or args.link or args.run or args.import_file or args.replay):
+        parser.print_help()
+        return
+
     config = load_config()
     if args.debug:
-        config["debug"] = True
+        # Copy so the flag is not written back to config.yml
+        config = {**config, "debug": True}
     setup_logging(config)
+
+    if args.replay:
+        run_replay(config, args.replay, args.speed, args.rpc_latency_ms)
+        return
     
     data_dir = Path("data")
     data_dir.mkdir(exist_ok=True)
@@ -707,6 +1108,8 @@ def main():
     
     accounts_dir = str((data_dir / "accounts").absolute())
     
+    from deltachat2 import Bot, Rpc, IOTransport
+    from deltachat2.events import HookCollection
     hooks = HookCollection()
     
     try:
@@ -714,12 +1117,12 @@ def main():
             rpc = Rpc(trans)
             
             if args.init:
+                from telegram_bridge import init_telegram
+                from invites import invite_links
                 bot = Bot(rpc, hooks, logger)
                 config = load_config()
                 
-                channels_to_mirror = config.get("channels_to_mirror", [])
-                if not channels_to_mirror and "out_channel" in config:
-                    channels_to_mirror = [config["out_channel"]]
+                channels_to_mirror = config_store.channels()
                 
                 channel_repo = ChannelRepository(db_path)
                 accounts_config = config.get("accounts", [])
@@ -770,25 +1173,24 @@ def main():
                 
                 save_config(config)
                 
-                # 3. Initialize Telegram Session
-                init_telegram_session(config)
-                
-                # 4. Sync name/photo for each channel if auto
-                sync_tg_info_to_dc(config, rpc)
+                # 3. Initialize Telegram Session and 4. sync name/photo for each
+                # channel if auto, both over one connection
+                init_telegram(config, rpc)
                 
                 # 5. Show links
                 print(f"\nSUCCESS! Delta Chat Telegram Bridge is configured.")
-                for channel_cfg in channels_to_mirror:
-                    chat_id = channel_cfg.get("chat_id")
-                    if chat_id:
-                        qrdata = rpc.get_chat_securejoin_qr_code(accid, chat_id)
-                        name = channel_cfg.get("name", channel_cfg.get("username", "Unknown"))
-                        print(f"\nBroadcast Channel link for '{name}' (Account #{accid}):")
-                        print(qrdata)
+                stored = {c.chat_id: c for c in channel_repo.get_by_accid(accid)}
+                configured = [c for c in channels_to_mirror if c.get("chat_id") in stored]
+                links = invite_links(rpc, channel_repo, accid, [stored[c["chat_id"]] for c in configured])
+                for channel_cfg in configured:
+                    name = channel_cfg.get("name", channel_cfg.get("username", "Unknown"))
+                    print(f"\nBroadcast Channel link for '{name}' (Account #{accid}):")
+                    print(links.get(channel_cfg["chat_id"], "unavailable"))
                 
                 print(f"\nYou can now run the bot with: uv run python app/main.py --run")
             
             elif args.link:
+                from invites import invite_links
                 bot = Bot(rpc, hooks, logger)
                 config = load_config()
                 accid = config.get("active_accid")
@@ -812,16 +1214,15 @@ def main():
                     apply_dc_proxy_config(rpc, accid, proxy_cfg)
                 
                 if rpc.is_configured(accid):
-                    channels_to_mirror = config.get("channels_to_mirror", [])
-                    if not channels_to_mirror and "out_channel" in config:
-                        channels_to_mirror = [config["out_channel"]]
+                    channels_to_mirror = config_store.channels()
                     
                     channel_repo = ChannelRepository(db_path)
+                    channels = []
                     for channel_cfg in channels_to_mirror:
                         chat_id = setup_channel(bot, accid, channel_cfg)
                         photo_cfg = channel_cfg.get("photo", {})
                         video_cfg = channel_cfg.get("video", {})
-                        channel_repo.save(Channel(
+                        channels.append(Channel(
                             accid=accid,
                             chat_id=chat_id,
                             name=channel_cfg.get("name", channel_cfg.get("username", "Unknown")),
@@ -830,19 +1231,37 @@ def main():
                             video_enabled=video_cfg.get("enable", True),
                             video_message=video_cfg.get("message", "[Video]")
                         ))
-                        qrdata = rpc.get_chat_securejoin_qr_code(accid, chat_id)
-                        name = channel_cfg.get("name", channel_cfg.get("username", "Unknown"))
-                        print(f"\nBroadcast Channel link for '{name}' (Account #{accid}):")
-                        print(qrdata)
+                    channel_repo.save_many(channels)
                     save_config(config)
+
+                    # Saving keeps cached invites, so only new or recreated chats hit the RPC
+                    stored = {c.chat_id: c for c in channel_repo.get_by_accid(accid)}
+                    links = invite_links(rpc, channel_repo, accid, [stored.get(c.chat_id, c) for c in channels])
+                    for chan in channels:
+                        print(f"\nBroadcast Channel link for '{chan.name}' (Account #{accid}):")
+                        print(links.get(chan.chat_id, "unavailable"))
                 else:
                     logger.error(f"Account #{accid} not configured.")
             
+            elif args.import_file:
+                from telegram_bridge import import_channels_offline
+                from bulk_import import parse_targets, format_summary
+                items = parse_targets(Path(args.import_file).read_text())
+                if not items:
+                    logger.error(f"No channels listed in {args.import_file}.")
+                    return
+                accounts = rpc.get_all_account_ids()
+                accid = config.get("active_accid")
+                if not accid or accid not in accounts:
+                    accid = accounts[0] if accounts else None
+                if not accid or not rpc.is_configured(accid):
+                    logger.error("No configured account. Use --init first.")
+                    return
+                import_channels_offline(config, rpc, ChannelRepository(db_path), accid, items)
+                print(format_summary(items))
+
             elif args.run:
-                run_bot(rpc, hooks)
-            
-            else:
-                parser.print_help()
+                run_bot(rpc, hooks, capture_file=args.capture)
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         import traceback
@@ -0,0 +1,98 @@
+import threading
+import time
+from logger import logger
+
+class MembershipTracker:
+    """Recipient sets of the mirrored channels, kept up to date from events.
+
+    Leave and modify events used to fetch the full contact list of the chat
+    every time, which costs as much as the channel has subscribers. Here
+    events only update an in-memory set (when they name the contact) and
+    schedule the enable/disable decision, which runs once per chat after
+    `debounce` seconds of quiet, or at the latest `max_delay` seconds after
+    the first event so that constant churn is still decided. The full list
+    is fetched only the first time a chat is decided and then every
+    `reconcile_interval` seconds, to catch changes that arrived without a
+    contact id.
+    """
+    def __init__(self, rpc, chan_repo, debounce: float = 5.0, reconcile_interval: float = 3600, max_delay: float = 60.0):
+        self.rpc = rpc
+        self.chan_repo = chan_repo
+        self.debounce = debounce
+        self.reconcile_interval = reconcile_interval
+        self.max_delay = max(max_delay, debounce)
+        self._lock = threading.Lock()
+        self._members = {} # chat_id -> set of recipient contact ids
+        self._reconciled = {} # chat_id -> time.monotonic() of the last full fetch
+        self._timers = {} # chat_id -> threading.Timer of the pending decision
+        self._first_event = {} # chat_id -> time.monotonic() of the first event since the last decision
+
+    def member_added(self, accid: int, chat_id: int, contact_id=None):
+        self._update(accid, chat_id, contact_id, added=True)
+
+    def member_removed(self, accid: int, chat_id: int, contact_id=None):
+        self._update(accid, chat_id, contact_id, added=False)
+
+    def chat_modified(self, accid: int, chat_id: int):
+        self._update(accid, chat_id, None, added=False)
+
+    def forget(self, chat_id: int):
+        with self._lock:
+            self._members.pop(chat_id, None)
+            self._reconciled.pop(chat_id, None)
+            self._first_event.pop(chat_id, None)
+            timer = self._timers.pop(chat_id, None)
+        if timer:
+            timer.cancel()
+
+    def _update(self, accid, chat_id, contact_id, added):
+        with self._lock:
+            members = self._members.get(chat_id)
+            if members is not None and contact_id:
+                if added:
+                    members.add(contact_id)
+                else:
+                    members.discard(contact_id)
+            # Each event restarts the quiet period, up to max_delay after the first one
+            now = time.monotonic()
+            first = self._first_event.setdefault(chat_id, now)
+            delay = min(self.debounce, first + self.max_delay - now)
+            previous = self._timers.get(chat_id)
+            timer = threading.Timer(max(delay, 0), self._decide, args=(accid, chat_id))
+            timer.daemon = True
+            self._timers[chat_id] = timer
+        if previous:
+            previous.cancel()
+        timer.start()
+
+    def _decide(self, accid, chat_id):
+        with self._lock:
+            # A timer that was replaced while it was already firing stands down
+            if self._timers.get(chat_id) is not threading.current_thread():
+                return
+            del self._timers[chat_id]
+            self._first_event.pop(chat_id, None)
+            members = self._members.get(chat_id)
+            stale = members is None or time.monotonic() - self._reconciled.get(chat_id, 0) > self.reconcile_interval
+        try:
+            if stale:
+                contacts = self.rpc.get_chat_contacts(accid, chat_id)
+                with self._lock:
+                    self._members[chat_id] = set(contacts)
+                    self._reconciled[chat_id] = time.monotonic()
+                count = len(contacts)
+                logger.debug(f"Reconciled recipients of channel {chat_id}: {count}")
+            else:
+                count = len(members)
+
+            chan = self.chan_repo.get_by_chat_id(accid, chat_id)
+            if not chan:
+                return
+            if count == 0 and chan.enabled:
+                logger.info(f"No recipients left in channel {chat_id}. Disabling relay.")
+                self.chan_repo.update_enabled(accid, chat_id, False)
+            elif count > 0 and not chan.enabled:
+                logger.info(f"Recipients detected in channel {chat_id}, re-enabling relay.")
+                self.chan_repo.update_enabled(accid, chat_id, True)
+        except Exception as e:
+            logger.debug(f"Error checking recipients for chat {chat_id}: {e}")
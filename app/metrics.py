@@ -0,0 +1,119 @@
+import logging
+from threading import Lock, Thread
+from logger import logger
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+class Metrics:
+    """Prometheus-style counters and gauges.
+
+    Series are written from the Telethon loop, the Delta Chat event thread
+    and the admin command workers alike, so updates take a short lock.
+    Collectors are callbacks that produce derived values and only run when
+    the endpoint is scraped.
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._counters = {} # (name, labels) -> value
+        self._gauges = {} # (name, labels) -> value
+        self._help = {} # name -> (type, help)
+        self._collectors = []
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def register_collector(self, callback):
+        """Register callback() -> iterable of (name, labels_dict, value) samples."""
+        self._collectors.append(callback)
+
+    def render(self) -> str:
+        samples = {} # name -> list of lines
+        with self._lock:
+            series = list(self._counters.items()) + list(self._gauges.items())
+        for (name, labels), value in series:
+            samples.setdefault(name, []).append(f"{name}{_format_labels(labels)} {value}")
+        for callback in list(self._collectors):
+            try:
+                for name, labels, value in callback():
+                    samples.setdefault(name, []).append(f"{name}{_format_labels(sorted(labels.items()))} {value}")
+            except Exception as e:
+                logger.debug(f"Metrics collector {callback} failed: {e}")
+
+        lines = []
+        for name in sorted(samples):
+            if name in self._help:
+                kind, help_text = self._help[name]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples[name])
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+metrics.describe("bridge_messages_relayed_total", "counter", "Telegram messages relayed to Delta Chat")
+metrics.describe("bridge_messages_skipped_total", "counter", "Telegram messages not relayed, by reason")
+metrics.describe("bridge_messages_failed_total", "counter", "Telegram messages that failed to send to Delta Chat")
+metrics.describe("bridge_dc_msg_failed_total", "counter", "MsgFailed events reported by Delta Chat")
+metrics.describe("bridge_download_bytes_total", "counter", "Bytes of Telegram media downloaded")
+metrics.describe("bridge_history_resent_total", "counter", "Messages resent to Delta Chat for history resend")
+metrics.describe("bridge_telegram_reconnects_total", "counter", "Telethon automatic reconnects")
+metrics.describe("bridge_telegram_updates_total", "counter", "Telegram updates seen by the chat filter")
+metrics.describe("bridge_pending_edits", "gauge", "Telegram edits waiting for their debounce period")
+metrics.describe("bridge_pending_deletes", "gauge", "Telegram deletions waiting to be flushed")
+metrics.describe("bridge_mirrored_channels", "gauge", "Telegram channels currently mirrored")
+metrics.describe("bridge_event_loop_lag_seconds", "gauge", "Latest measured Telethon event loop lag")
+metrics.describe("bridge_stage_latency_seconds", "gauge", "Relay stage latency quantiles over the recent window")
+
+class _ReconnectCounter(logging.Filter):
+    """Counts Telethon reconnects from its sender log, which has no public hook."""
+    def filter(self, record):
+        if str(record.msg).startswith("Closing current connection to begin reconnect"):
+            metrics.inc("bridge_telegram_reconnects_total")
+        return True
+
+def track_telethon_reconnects():
+    sender_logger = logging.getLogger("telethon.network.mtprotosender")
+    if sender_logger.getEffectiveLevel() > logging.INFO:
+        sender_logger.setLevel(logging.INFO)
+    sender_logger.addFilter(_ReconnectCounter())
+
+def start_metrics_server(host: str = "127.0.0.1", port: int = 9464):
+    # http.server is only paid for when the endpoint is enabled
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(f"Metrics request: {format % args}")
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+    return server
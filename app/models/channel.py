@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Channel:
     accid: int
     chat_id: int
@@ -12,3 +12,11 @@ class Channel:
     video_enabled: bool = True
     video_message: str = "[Video]"
     enabled: bool = True
+    invite_qr: Optional[str] = None
+    invite_key: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """sqlite3 row factory for `SELECT accid, chat_id, name, link, photo_enabled,
+        photo_message, video_enabled, video_message, enabled, invite_qr, invite_key`."""
+        return cls(row[0], row[1], row[2], row[3], bool(row[4]), row[5], bool(row[6]), row[7], bool(row[8]), row[9], row[10])
@@ -1,12 +1,39 @@
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Callable, Optional
 
-@dataclass
+_NOT_LOADED = object()
+
+@dataclass(slots=True, init=False)
 class Message:
+    """A Telegram -> Delta Chat message mapping.
+
+    `text` is only needed to skip no-op edits, so bulk lookups leave it out
+    and pass a `text_loader(id)` that fetches it on first access.
+    """
     telegram_msg_id: int
-    dc_msg_id: Optional[int] = None
-    dc_chat_id: Optional[int] = None
-    text: Optional[str] = None
-    media_path: Optional[str] = None
-    media_type: Optional[str] = None # text, image, video
-    id: Optional[int] = None
+    dc_msg_id: Optional[int]
+    dc_chat_id: Optional[int]
+    media_path: Optional[str]
+    media_type: Optional[str] # text, image, video
+    id: Optional[int]
+    _text: object = field(repr=False, compare=False) # _NOT_LOADED until first access
+    _text_loader: Optional[Callable[[int], Optional[str]]] = field(repr=False, compare=False)
+
+    def __init__(self, telegram_msg_id: int, dc_msg_id: Optional[int] = None, dc_chat_id: Optional[int] = None,
+                 text: Optional[str] = None, media_path: Optional[str] = None, media_type: Optional[str] = None,
+                 id: Optional[int] = None, text_loader: Optional[Callable[[int], Optional[str]]] = None):
+        self.telegram_msg_id = telegram_msg_id
+        self.dc_msg_id = dc_msg_id
+        self.dc_chat_id = dc_chat_id
+        self.media_path = media_path
+        self.media_type = media_type
+        self.id = id
+        self._text = _NOT_LOADED if text_loader else text
+        self._text_loader = text_loader
+
+    @property
+    def text(self) -> Optional[str]:
+        if self._text is _NOT_LOADED:
+            self._text = self._text_loader(self.id)
+            self._text_loader = None
+        return self._text
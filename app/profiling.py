@@ -0,0 +1,124 @@
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from logger import logger
+
+def _run_in_loop(loop, func, timeout: float = 10):
+    """Run func() on the given event loop's thread and return its result."""
+    async def call():
+        return func()
+    return asyncio.run_coroutine_threadsafe(call(), loop).result(timeout)
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})"
+
+class ProfileSession:
+    """Sampling profiler for the Telegram loop thread and the Delta Chat hook thread.
+
+    A background thread snapshots the stacks of the watched threads with
+    sys._current_frames(). Unlike cProfile (a single process-wide profiler
+    since Python 3.12) this keeps the threads apart and costs nothing
+    between samples.
+    """
+    def __init__(self, profiles_dir: str = "data/profiles", top_n: int = 20, interval: float = 0.005):
+        self.profiles_dir = Path(profiles_dir)
+        self.top_n = top_n
+        self.interval = interval
+        self.started_at = None
+        self._threads = {} # thread ident -> label
+        self._stacks = {} # label -> Counter of collapsed stacks
+        self._samples = 0
+        self._stop = threading.Event()
+        self._sampler = None
+
+    @property
+    def running(self) -> bool:
+        return self.started_at is not None
+
+    def start(self, bridge=None, dc_thread: int = None) -> str:
+        """Start sampling the Delta Chat hook thread (`dc_thread`, default:
+        the calling thread) and the Telegram loop of `bridge`."""
+        if self.running:
+            return "Profiler is already running."
+
+        self._threads = {dc_thread or threading.get_ident(): "deltachat"}
+        if bridge and bridge.loop:
+            self._threads[_run_in_loop(bridge.loop, threading.get_ident)] = "telegram"
+        self._stacks = {label: Counter() for label in self._threads.values()}
+        self._samples = 0
+        self._stop.clear()
+        self.started_at = time.time()
+        self._sampler = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._sampler.start()
+        logger.info(f"Profiler started for threads: {', '.join(self._stacks)}")
+        return f"Profiler started ({', '.join(self._stacks)})."
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, label in self._threads.items():
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if stack:
+                    self._stacks[label][";".join(reversed(stack))] += 1
+            self._samples += 1
+
+    def stop(self) -> str:
+        """Stop sampling, write collapsed-stack files and return the hottest functions."""
+        if not self.running:
+            return "Profiler is not running."
+
+        self._stop.set()
+        self._sampler.join()
+        duration = time.time() - self.started_at
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+        self.profiles_dir.mkdir(exist_ok=True, parents=True)
+
+        report = [f"Profiled {duration:.1f}s ({self._samples} samples)."]
+        for label, stacks in self._stacks.items():
+            # Collapsed-stack format, readable by flamegraph.pl / speedscope
+            path = self.profiles_dir / f"{stamp}-{label}.folded"
+            with open(path, "w") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            logger.info(f"Wrote {label} profile to {path}")
+
+            own, total = Counter(), Counter()
+            for stack, count in stacks.items():
+                functions = stack.split(";")
+                own[functions[-1]] += count
+                for function in set(functions):
+                    total[function] += count
+            samples = sum(stacks.values()) or 1
+            report.append(f"\n== {label} ({path}) ==")
+            report.append("own%  total%  function")
+            for function, count in own.most_common(self.top_n):
+                report.append(f"{count * 100 / samples:5.1f} {total[function] * 100 / samples:6.1f}  {function}")
+
+        self.started_at = None
+        self._sampler = None
+        return "\n".join(report)
+
+def describe_tasks(bridge, limit: int = 50) -> str:
+    """List pending asyncio tasks of the Telegram bridge loop."""
+    def collect():
+        lines = []
+        for task in asyncio.all_tasks(bridge.loop):
+            coro = task.get_coro()
+            frame = getattr(coro, "cr_frame", None)
+            where = f"{frame.f_code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno}" if frame else "?"
+            lines.append(f"- {getattr(coro, '__qualname__', coro)} at {where}")
+        return lines
+
+    lines = sorted(_run_in_loop(bridge.loop, collect))
+    header = f"Pending asyncio tasks: {len(lines)}"
+    if len(lines) > limit:
+        lines = lines[:limit] + [f"... and {len(lines) - limit} more"]
+    return "\n".join([header] + lines)
@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+from typing import Callable, Optional
+from models.channel import Channel
+
+TextStep = Callable[[str, object], str]
+
+def _make_prefixer(media_attr: str, prefix: str) -> TextStep:
+    def prefix_placeholder(text, message):
+        if getattr(message, media_attr, None):
+            return f"{prefix} {text}" if text else prefix
+        return text
+    return prefix_placeholder
+
+def _iter_message_urls(message):
+    if message.entities:
+        for entity in message.entities:
+            yield getattr(entity, 'url', None)
+    if message.buttons:
+        for row in message.buttons:
+            for button in row:
+                yield getattr(button, 'url', None)
+    wp = getattr(message, 'web_preview', None)
+    if wp:
+        yield getattr(wp, 'url', None)
+
+def append_extra_links(text, message):
+    """Append links hidden in entities, buttons or the web preview."""
+    extra_links = []
+    seen = set()
+    for url in _iter_message_urls(message):
+        if not url or url in seen:
+            continue
+        seen.add(url)
+        if url not in text:
+            extra_links.append(url)
+
+    if not extra_links:
+        return text
+    links_text = "\n".join(extra_links)
+    return f"{text}\n\n{links_text}" if text else links_text
+
+@dataclass(frozen=True, slots=True)
+class RelayPolicy:
+    """Per-channel relay settings, compiled once from config and DB state."""
+    dc_chat_id: int
+    enabled: bool = True
+    photo_enabled: bool = True
+    video_enabled: bool = True
+    text_pipeline: tuple[TextStep, ...] = (append_extra_links,)
+
+    @classmethod
+    def compile(cls, channel_cfg: dict, chan: Optional[Channel] = None) -> "RelayPolicy":
+        # Defaults from config, overridden by DB settings if available
+        photo_cfg = channel_cfg.get('photo', {})
+        video_cfg = channel_cfg.get('video', {})
+        enabled = True
+        photo_enabled = photo_cfg.get('enable', True)
+        photo_prefix = photo_cfg.get('message', '[Photo]')
+        video_enabled = video_cfg.get('enable', True)
+        video_prefix = video_cfg.get('message', '[Video]')
+        if chan:
+            enabled = chan.enabled
+            photo_enabled = chan.photo_enabled
+            photo_prefix = chan.photo_message
+            video_enabled = chan.video_enabled
+            video_prefix = chan.video_message
+
+        steps = []
+        if not photo_enabled:
+            steps.append(_make_prefixer('photo', photo_prefix))
+        if not video_enabled:
+            steps.append(_make_prefixer('video', video_prefix))
+        steps.append(append_extra_links)
+
+        return cls(
+            dc_chat_id=channel_cfg.get('chat_id'),
+            enabled=enabled,
+            photo_enabled=photo_enabled,
+            video_enabled=video_enabled,
+            text_pipeline=tuple(steps)
+        )
+
+    def media_plan(self, message) -> tuple[str, bool]:
+        """Return (media_type, should_download) for a Telegram message."""
+        if message.photo:
+            return "image", self.photo_enabled
+        if message.video:
+            return "video", self.video_enabled
+        if message.file:
+            # Other file types (stickers, documents, audio, etc.)
+            return "file", True
+        return "text", False
+
+    def render_text(self, message) -> str:
+        text = message.message or ""
+        for step in self.text_pipeline:
+            text = step(text, message)
+        return text
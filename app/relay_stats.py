@@ -0,0 +1,79 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Stages of the Telegram -> Delta Chat relay path, in pipeline order
+STAGES = ("receive_lag", "db_lookup", "download", "sender_lookup", "send_msg", "save_mapping", "total")
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(pct / 100 * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+class RelayStats:
+    """In-memory per-channel latency samples for each relay stage.
+
+    Each (channel, stage) pair keeps the most recent `window` samples, so
+    percentiles describe recent behaviour and memory stays bounded.
+    """
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self._samples = {} # (dc_chat_id, stage) -> deque of seconds
+        self.download_bytes = {} # dc_chat_id -> total bytes downloaded
+
+    def record(self, dc_chat_id, stage: str, seconds: float):
+        samples = self._samples.get((dc_chat_id, stage))
+        if samples is None:
+            samples = self._samples[(dc_chat_id, stage)] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def add_bytes(self, dc_chat_id, size: int):
+        self.download_bytes[dc_chat_id] = self.download_bytes.get(dc_chat_id, 0) + size
+
+    def total(self, stage: str) -> float:
+        """Sum of the retained samples for a stage across all channels."""
+        return sum(sum(samples) for (_, s), samples in list(self._samples.items()) if s == stage)
+
+    @contextmanager
+    def span(self, dc_chat_id, stage: str, timings: dict = None):
+        """Time a block; optionally also accumulate it into a per-message timings dict."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.record(dc_chat_id, stage, seconds)
+            if timings is not None:
+                timings[stage] = timings.get(stage, 0.0) + seconds
+
+    def summary(self) -> dict:
+        """Return {dc_chat_id: {stage: (count, p50, p95, p99)}}."""
+        result = {}
+        for (dc_chat_id, stage), samples in list(self._samples.items()):
+            ordered = sorted(samples)
+            result.setdefault(dc_chat_id, {})[stage] = (
+                len(ordered),
+                percentile(ordered, 50),
+                percentile(ordered, 95),
+                percentile(ordered, 99)
+            )
+        return result
+
+    def format_summary(self) -> str:
+        summary = self.summary()
+        if not summary:
+            return "No relay statistics yet."
+
+        lines = []
+        for dc_chat_id in sorted(summary, key=str):
+            stages = summary[dc_chat_id]
+            header = f"Channel {dc_chat_id}"
+            if dc_chat_id in self.download_bytes:
+                header += f" (downloaded {self.download_bytes[dc_chat_id] / 1024 / 1024:.1f} MiB)"
+            lines.append(header)
+            for stage in STAGES:
+                if stage in stages:
+                    count, p50, p95, p99 = stages[stage]
+                    lines.append(f"  {stage}: n={count} p50={p50 * 1000:.0f}ms p95={p95 * 1000:.0f}ms p99={p99 * 1000:.0f}ms")
+        return "\n".join(lines)
@@ -1,18 +1,26 @@
 import sqlite3
 
 class AdminRepository:
+    """Admin contact ids, kept in memory and written through to the `admins` table.
+
+    `is_admin` runs for every message the bot receives outside the mirrored
+    channels, so it is a set lookup instead of a query. Writers swap in a
+    new frozenset, which readers on other threads see atomically.
+    """
     def __init__(self, db_path: str):
         self.db_path = db_path
+        with sqlite3.connect(self.db_path) as conn:
+            self._admins = frozenset(row[0] for row in conn.execute("SELECT contact_id FROM admins"))
 
     def add_admin(self, contact_id: int):
         with sqlite3.connect(self.db_path) as conn:
             conn.execute("INSERT OR IGNORE INTO admins (contact_id) VALUES (?)", (contact_id,))
+        self._admins = self._admins | {contact_id}
 
     def is_admin(self, contact_id: int) -> bool:
-        with sqlite3.connect(self.db_path) as conn:
-            cur = conn.execute("SELECT 1 FROM admins WHERE contact_id = ?", (contact_id,))
-            return cur.fetchone() is not None
+        return contact_id in self._admins
 
     def remove_admin(self, contact_id: int):
         with sqlite3.connect(self.db_path) as conn:
             conn.execute("DELETE FROM admins WHERE contact_id = ?", (contact_id,))
+        self._admins = self._admins - {contact_id}
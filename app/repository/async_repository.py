@@ -0,0 +1,194 @@
+import asyncio
+import queue
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+from logger import logger
+from models.channel import Channel
+from models.message import Message
+from repository import channel_repository as channel_sql
+from repository import message_repository as message_sql
+
+class DbWorker:
+    """Single thread that runs all SQLite access of the asyncio side.
+
+    Coroutines put requests on a queue and await a future, so the event loop
+    never blocks on SQLite. The worker keeps one connection open and drains
+    whatever has queued up in one go: writes run back to back in a single
+    transaction (one commit for the whole batch, each request in its own
+    savepoint), and concurrent single-row lookups for the same chat are
+    merged into one IN query. Results are handed back with one wakeup per
+    event loop per batch.
+    """
+    def __init__(self, db_path: str, max_batch: int = 256):
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="db-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args, write: bool = False) -> asyncio.Future:
+        """Schedule func(conn, *args) on the worker thread."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put((func, args, write, future, loop))
+        return future
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        running = True
+        while running:
+            request = self._queue.get()
+            if request is None:
+                break
+            batch = [request]
+            while len(batch) < self.max_batch:
+                try:
+                    request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    running = False
+                    break
+                batch.append(request)
+            self._deliver(batch, self._execute(conn, batch))
+        conn.close()
+
+    def _execute(self, conn, batch) -> list:
+        outcomes = [None] * len(batch)
+        writes = [i for i, request in enumerate(batch) if request[2]]
+        if writes:
+            self._execute_writes(conn, batch, writes, outcomes)
+
+        lookups = {} # (dc_chat_id, with_text) -> request indexes
+        for i, (func, args, write, _, _) in enumerate(batch):
+            if write:
+                continue
+            if func is _lookup:
+                lookups.setdefault((args[2], args[3]), []).append(i)
+                continue
+            try:
+                outcomes[i] = (True, func(conn, *args))
+            except Exception as e:
+                outcomes[i] = (False, e)
+
+        for (dc_chat_id, with_text), indexes in lookups.items():
+            row_factory = batch[indexes[0]][1][0]
+            tg_ids = list({batch[i][1][1] for i in indexes})
+            try:
+                found = {m.telegram_msg_id: m for m in message_sql.fetch_by_telegram_ids(conn, row_factory, tg_ids, dc_chat_id, with_text)}
+                for i in indexes:
+                    outcomes[i] = (True, found.get(batch[i][1][1]))
+            except Exception as e:
+                for i in indexes:
+                    outcomes[i] = (False, e)
+        return outcomes
+
+    def _execute_writes(self, conn, batch, writes, outcomes):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except Exception as e:
+            for i in writes:
+                outcomes[i] = (False, e)
+            return
+        for i in writes:
+            func, args = batch[i][0], batch[i][1]
+            conn.execute("SAVEPOINT request")
+            try:
+                outcomes[i] = (True, func(conn, *args))
+                conn.execute("RELEASE request")
+            except Exception as e:
+                conn.execute("ROLLBACK TO request")
+                conn.execute("RELEASE request")
+                outcomes[i] = (False, e)
+        try:
+            conn.execute("COMMIT")
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            for i in writes:
+                outcomes[i] = (False, e)
+
+    def _deliver(self, batch, outcomes):
+        by_loop = {}
+        for (_, _, _, future, loop), outcome in zip(batch, outcomes):
+            by_loop.setdefault(loop, []).append((future, outcome))
+        for loop, results in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_resolve, results)
+            except RuntimeError:
+                logger.debug("Event loop closed before database results were delivered")
+
+def _resolve(results):
+    for future, (ok, value) in results:
+        if future.cancelled():
+            continue
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+def _lookup(conn, row_factory, telegram_msg_id, dc_chat_id, with_text):
+    # Marker for single-message lookups; the worker batches these per chat
+    found = message_sql.fetch_by_telegram_ids(conn, row_factory, [telegram_msg_id], dc_chat_id, with_text)
+    return found[0] if found else None
+
+class AsyncMessageRepository:
+    """Awaitable MessageRepository API for the Telethon side, served by a DbWorker."""
+    def __init__(self, worker: DbWorker, msg_repo):
+        self.worker = worker
+        # Lazy `text` of returned messages is loaded through the sync repository
+        self.row_factory = msg_repo.row_factory
+
+    async def save(self, msg: Message):
+        await self.worker.submit(message_sql.save_messages, [msg], write=True)
+
+    async def save_many(self, msgs: List[Message]):
+        if msgs:
+            await self.worker.submit(message_sql.save_messages, msgs, write=True)
+
+    async def get_by_telegram_id(self, telegram_msg_id: int, dc_chat_id: int, with_text: bool = False) -> Optional[Message]:
+        return await self.worker.submit(_lookup, self.row_factory, telegram_msg_id, dc_chat_id, with_text)
+
+    async def get_by_telegram_ids(self, telegram_msg_ids: List[int], dc_chat_id: int, with_text: bool = False) -> List[Message]:
+        return await self.worker.submit(message_sql.fetch_by_telegram_ids, self.row_factory, telegram_msg_ids, dc_chat_id, with_text)
+
+    async def get_latest_ids(self, chat_id: int, limit: int = 10, before_telegram_msg_id: Optional[int] = None) -> List[Tuple[int, int]]:
+        return await self.worker.submit(message_sql.fetch_latest_ids, chat_id, limit, before_telegram_msg_id)
+
+    async def update_text(self, telegram_msg_id: int, dc_chat_id: int, text: str):
+        await self.worker.submit(message_sql.update_text, telegram_msg_id, dc_chat_id, text, write=True)
+
+    async def delete_by_telegram_ids(self, telegram_msg_ids: List[int], dc_chat_id: int):
+        await self.worker.submit(message_sql.delete_by_telegram_ids, telegram_msg_ids, dc_chat_id, write=True)
+
+class AsyncChannelRepository:
+    """Awaitable ChannelRepository API for the Telethon side; writes notify `channel_repo`'s listeners."""
+    def __init__(self, worker: DbWorker, channel_repo=None):
+        self.worker = worker
+        self.channel_repo = channel_repo
+
+    async def get_by_chat_id(self, accid: int, chat_id: int) -> Optional[Channel]:
+        return await self.worker.submit(channel_sql.fetch_channel, accid, chat_id)
+
+    async def get_by_accid(self, accid: int) -> List[Channel]:
+        return await self.worker.submit(channel_sql.fetch_channels, accid)
+
+    async def save(self, channel: Channel):
+        await self.save_many([channel])
+
+    async def save_many(self, channels: List[Channel]):
+        if not channels:
+            return
+        await self.worker.submit(channel_sql.save_channels, channels, write=True)
+        if self.channel_repo:
+            for channel in channels:
+                self.channel_repo.notify(channel.accid, channel.chat_id)
+
+    async def delete(self, accid: int, chat_id: int):
+        await self.worker.submit(channel_sql.delete_channel, accid, chat_id, write=True)
+        if self.channel_repo:
+            self.channel_repo.notify(accid, chat_id)
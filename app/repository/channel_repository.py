@@ -3,76 +3,88 @@ from pathlib import Path
 from typing import Optional
 from models.channel import Channel
 
+_SELECT = "SELECT accid, chat_id, name, link, photo_enabled, photo_message, video_enabled, video_message, enabled, invite_qr, invite_key FROM channels"
+
+def fetch_channels(conn, accid: int) -> list[Channel]:
+    cur = conn.cursor()
+    cur.row_factory = Channel.from_row
+    return cur.execute(f"{_SELECT} WHERE accid = ?", (accid,)).fetchall()
+
+def fetch_channel(conn, accid: int, chat_id: int) -> Optional[Channel]:
+    cur = conn.cursor()
+    cur.row_factory = Channel.from_row
+    return cur.execute(f"{_SELECT} WHERE accid = ? AND chat_id = ?", (accid, chat_id)).fetchone()
+
+def save_channels(conn, channels: list[Channel]):
+    conn.executemany("""
+        INSERT INTO channels (accid, chat_id, name, link, photo_enabled, photo_message, video_enabled, video_message, enabled, invite_qr, invite_key)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (accid, chat_id) DO UPDATE SET
+            name = excluded.name, link = excluded.link,
+            photo_enabled = excluded.photo_enabled, photo_message = excluded.photo_message,
+            video_enabled = excluded.video_enabled, video_message = excluded.video_message,
+            enabled = excluded.enabled,
+            invite_qr = COALESCE(excluded.invite_qr, invite_qr),
+            invite_key = COALESCE(excluded.invite_key, invite_key)
+    """, [(channel.accid, channel.chat_id, channel.name, channel.link,
+           int(channel.photo_enabled), channel.photo_message,
+           int(channel.video_enabled), channel.video_message, int(channel.enabled),
+           channel.invite_qr, channel.invite_key) for channel in channels])
+
+def delete_channel(conn, accid: int, chat_id: int):
+    conn.execute("DELETE FROM channels WHERE accid = ? AND chat_id = ?", (accid, chat_id))
+
 class ChannelRepository:
     def __init__(self, db_path: str):
         self.db_path = db_path
-        self._init_db()
+        self._listeners = []
 
-    def _init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS channels (
-                    accid INTEGER,
-                    chat_id INTEGER,
-                    name TEXT,
-                    link TEXT,
-                    photo_enabled INTEGER DEFAULT 1,
-                    photo_message TEXT DEFAULT '[Photo]',
-                    video_enabled INTEGER DEFAULT 1,
-                    video_message TEXT DEFAULT '[Video]',
-                    enabled INTEGER DEFAULT 1,
-                    PRIMARY KEY (accid, chat_id)
-                )
-            """)
+    def subscribe(self, callback):
+        """Register callback(accid, chat_id) to be called after a channel row changes."""
+        self._listeners.append(callback)
+
+    def notify(self, accid: int, chat_id: int):
+        """Call the listeners; also used by AsyncChannelRepository after its writes."""
+        for callback in self._listeners:
+            callback(accid, chat_id)
 
     def get_by_accid(self, accid: int) -> list[Channel]:
-        channels = []
         with sqlite3.connect(self.db_path) as conn:
-            cur = conn.execute("SELECT accid, chat_id, name, link, photo_enabled, photo_message, video_enabled, video_message, enabled FROM channels WHERE accid = ?", (accid,))
-            for row in cur.fetchall():
-                channels.append(Channel(
-                    accid=row[0], 
-                    chat_id=row[1], 
-                    name=row[2], 
-                    link=row[3], 
-                    photo_enabled=bool(row[4]),
-                    photo_message=row[5],
-                    video_enabled=bool(row[6]),
-                    video_message=row[7],
-                    enabled=bool(row[8])
-                ))
-        return channels
+            return fetch_channels(conn, accid)
 
     def save(self, channel: Channel):
+        self.save_many([channel])
+
+    def save_many(self, channels: list[Channel]):
+        """Insert or update several channels in one transaction.
+
+        A cached invite is kept when the saved channel carries none, so
+        settings changes do not force the QR code to be fetched again.
+        """
         with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                INSERT OR REPLACE INTO channels (accid, chat_id, name, link, photo_enabled, photo_message, video_enabled, video_message, enabled)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (channel.accid, channel.chat_id, channel.name, channel.link, 
-                  int(channel.photo_enabled), channel.photo_message, 
-                  int(channel.video_enabled), channel.video_message, int(channel.enabled)))
+            save_channels(conn, channels)
+        for channel in channels:
+            self.notify(channel.accid, channel.chat_id)
+
+    def update_invites(self, accid: int, invites: list[tuple[int, str, str]]):
+        """Store (chat_id, invite_qr, invite_key) for several channels in one transaction."""
+        # Relay policies do not depend on the invite, so listeners are not notified
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany(
+                "UPDATE channels SET invite_qr = ?, invite_key = ? WHERE accid = ? AND chat_id = ?",
+                [(qr, key, accid, chat_id) for chat_id, qr, key in invites],
+            )
 
     def update_enabled(self, accid: int, chat_id: int, enabled: bool):
         with sqlite3.connect(self.db_path) as conn:
             conn.execute("UPDATE channels SET enabled = ? WHERE accid = ? AND chat_id = ?", (int(enabled), accid, chat_id))
+        self.notify(accid, chat_id)
 
     def get_by_chat_id(self, accid: int, chat_id: int) -> Optional[Channel]:
         with sqlite3.connect(self.db_path) as conn:
-            cur = conn.execute("SELECT accid, chat_id, name, link, photo_enabled, photo_message, video_enabled, video_message, enabled FROM channels WHERE accid = ? AND chat_id = ?", (accid, chat_id))
-            row = cur.fetchone()
-            if row:
-                return Channel(
-                    accid=row[0], 
-                    chat_id=row[1], 
-                    name=row[2], 
-                    link=row[3], 
-                    photo_enabled=bool(row[4]),
-                    photo_message=row[5],
-                    video_enabled=bool(row[6]),
-                    video_message=row[7],
-                    enabled=bool(row[8])
-                )
-        return None
+            return fetch_channel(conn, accid, chat_id)
+
     def delete(self, accid: int, chat_id: int):
         with sqlite3.connect(self.db_path) as conn:
-            conn.execute("DELETE FROM channels WHERE accid = ? AND chat_id = ?", (accid, chat_id))
+            delete_channel(conn, accid, chat_id)
+        self.notify(accid, chat_id)
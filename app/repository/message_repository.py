@@ -1,59 +1,120 @@
 import sqlite3
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from models.message import Message
 
+# Upper bound for keyset pagination when no page boundary is given
+_MAX_ID = 2**63 - 1
+
+# Bulk lookups leave out `text`, which is loaded on first access
+_COLUMNS = "telegram_msg_id, dc_msg_id, dc_chat_id, media_path, media_type, id"
+_COLUMNS_WITH_TEXT = _COLUMNS + ", text"
+
+def _message_with_text(cursor, row) -> Message:
+    return Message(row[0], row[1], row[2], row[6], row[3], row[4], row[5])
+
+# Queries take an open connection so the sync repository and the async DB
+# worker (repository/async_repository.py) share the same SQL.
+
+def save_messages(conn, msgs: List[Message]):
+    conn.executemany("""
+        REPLACE INTO messages (telegram_msg_id, dc_msg_id, dc_chat_id, text, media_path, media_type)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [(msg.telegram_msg_id, msg.dc_msg_id, msg.dc_chat_id, msg.text, msg.media_path, msg.media_type) for msg in msgs])
+
+def fetch_latest_ids(conn, chat_id: int, limit: int, before_telegram_msg_id: Optional[int]) -> List[Tuple[int, int]]:
+    rows = conn.execute("""
+        SELECT telegram_msg_id, dc_msg_id FROM messages
+        WHERE dc_chat_id = ? AND dc_msg_id IS NOT NULL AND telegram_msg_id < ?
+        ORDER BY telegram_msg_id DESC
+        LIMIT ?
+    """, (chat_id, _MAX_ID if before_telegram_msg_id is None else before_telegram_msg_id, limit)).fetchall()
+    rows.reverse()
+    return rows
+
+def fetch_latest(conn, row_factory, chat_id: int, limit: int, before_telegram_msg_id: Optional[int]) -> List[Message]:
+    cur = conn.cursor()
+    cur.row_factory = row_factory
+    messages = cur.execute(f"""
+        SELECT {_COLUMNS}
+        FROM messages
+        WHERE dc_chat_id = ? AND dc_msg_id IS NOT NULL AND telegram_msg_id < ?
+        ORDER BY telegram_msg_id DESC
+        LIMIT ?
+    """, (chat_id, _MAX_ID if before_telegram_msg_id is None else before_telegram_msg_id, limit)).fetchall()
+    messages.reverse()
+    return messages
+
+def fetch_by_telegram_ids(conn, row_factory, telegram_msg_ids: List[int], dc_chat_id: int, with_text: bool = False) -> List[Message]:
+    if not telegram_msg_ids:
+        return []
+    placeholders = ",".join("?" * len(telegram_msg_ids))
+    cur = conn.cursor()
+    cur.row_factory = _message_with_text if with_text else row_factory
+    return cur.execute(f"""
+        SELECT {_COLUMNS_WITH_TEXT if with_text else _COLUMNS}
+        FROM messages
+        WHERE dc_chat_id = ? AND telegram_msg_id IN ({placeholders})
+    """, (dc_chat_id, *telegram_msg_ids)).fetchall()
+
+def fetch_text(conn, id: int) -> Optional[str]:
+    row = conn.execute("SELECT text FROM messages WHERE id = ?", (id,)).fetchone()
+    return row[0] if row else None
+
+def update_text(conn, telegram_msg_id: int, dc_chat_id: int, text: str):
+    conn.execute("UPDATE messages SET text = ? WHERE telegram_msg_id = ? AND dc_chat_id = ?", (text, telegram_msg_id, dc_chat_id))
+
+def delete_by_telegram_ids(conn, telegram_msg_ids: List[int], dc_chat_id: int):
+    if not telegram_msg_ids:
+        return
+    placeholders = ",".join("?" * len(telegram_msg_ids))
+    conn.execute(f"DELETE FROM messages WHERE dc_chat_id = ? AND telegram_msg_id IN ({placeholders})", (dc_chat_id, *telegram_msg_ids))
+
 class MessageRepository:
     def __init__(self, db_path: str):
         self.db_path = db_path
+        # Built once so rows share one loader instead of a bound method each
+        text_loader = self.get_text
+        self.row_factory = lambda cursor, row: Message(row[0], row[1], row[2], None, row[3], row[4], row[5], text_loader)
 
     def save(self, msg: Message):
         with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                REPLACE INTO messages (telegram_msg_id, dc_msg_id, dc_chat_id, text, media_path, media_type)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (msg.telegram_msg_id, msg.dc_msg_id, msg.dc_chat_id, msg.text, msg.media_path, msg.media_type))
-
-    def get_latest(self, chat_id: int, limit: int = 10) -> List[Message]:
-        with sqlite3.connect(self.db_path) as conn:
-            cur = conn.execute("""
-                SELECT telegram_msg_id, dc_msg_id, dc_chat_id, text, media_path, media_type, id
-                FROM messages
-                WHERE dc_chat_id = ? AND dc_msg_id IS NOT NULL
-                ORDER BY telegram_msg_id DESC
-                LIMIT ?
-            """, (chat_id, limit))
-            rows = cur.fetchall()
-            messages = []
-            for row in rows:
-                messages.append(Message(
-                    telegram_msg_id=row[0],
-                    dc_msg_id=row[1],
-                    dc_chat_id=row[2],
-                    text=row[3],
-                    media_path=row[4],
-                    media_type=row[5],
-                    id=row[6]
-                ))
-            messages.reverse()
-            return messages
-
-    def get_by_telegram_id(self, telegram_msg_id: int, dc_chat_id: int) -> Optional[Message]:
-        with sqlite3.connect(self.db_path) as conn:
-            cur = conn.execute("""
-                SELECT telegram_msg_id, dc_msg_id, dc_chat_id, text, media_path, media_type, id
-                FROM messages
-                WHERE telegram_msg_id = ? AND dc_chat_id = ?
-                LIMIT 1
-            """, (telegram_msg_id, dc_chat_id))
-            row = cur.fetchone()
-            if row:
-                return Message(
-                    telegram_msg_id=row[0],
-                    dc_msg_id=row[1],
-                    dc_chat_id=row[2],
-                    text=row[3],
-                    media_path=row[4],
-                    media_type=row[5],
-                    id=row[6]
-                )
-            return None
+            save_messages(conn, [msg])
+
+    def save_many(self, msgs: List[Message]):
+        with sqlite3.connect(self.db_path) as conn:
+            save_messages(conn, msgs)
+
+    def get_latest_ids(self, chat_id: int, limit: int = 10, before_telegram_msg_id: Optional[int] = None) -> List[Tuple[int, int]]:
+        """(telegram_msg_id, dc_msg_id) of the newest relayed messages, oldest first.
+
+        Answered from idx_messages_latest alone. Pass the smallest
+        telegram_msg_id of a page as `before_telegram_msg_id` to get the
+        page before it.
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            return fetch_latest_ids(conn, chat_id, limit, before_telegram_msg_id)
+
+    def get_latest(self, chat_id: int, limit: int = 10, before_telegram_msg_id: Optional[int] = None) -> List[Message]:
+        with sqlite3.connect(self.db_path) as conn:
+            return fetch_latest(conn, self.row_factory, chat_id, limit, before_telegram_msg_id)
+
+    def get_by_telegram_id(self, telegram_msg_id: int, dc_chat_id: int, with_text: bool = False) -> Optional[Message]:
+        with sqlite3.connect(self.db_path) as conn:
+            found = fetch_by_telegram_ids(conn, self.row_factory, [telegram_msg_id], dc_chat_id, with_text)
+        return found[0] if found else None
+
+    def get_by_telegram_ids(self, telegram_msg_ids: List[int], dc_chat_id: int, with_text: bool = False) -> List[Message]:
+        with sqlite3.connect(self.db_path) as conn:
+            return fetch_by_telegram_ids(conn, self.row_factory, telegram_msg_ids, dc_chat_id, with_text)
+
+    def get_text(self, id: int) -> Optional[str]:
+        with sqlite3.connect(self.db_path) as conn:
+            return fetch_text(conn, id)
+
+    def update_text(self, telegram_msg_id: int, dc_chat_id: int, text: str):
+        with sqlite3.connect(self.db_path) as conn:
+            update_text(conn, telegram_msg_id, dc_chat_id, text)
+
+    def delete_by_telegram_ids(self, telegram_msg_ids: List[int], dc_chat_id: int):
+        with sqlite3.connect(self.db_path) as conn:
+            delete_by_telegram_ids(conn, telegram_msg_ids, dc_chat_id)
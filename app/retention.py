@@ -0,0 +1,197 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from logger import logger
+from metrics import metrics
+
+metrics.describe("bridge_db_size_bytes", "gauge", "Size of the SQLite database file")
+metrics.describe("bridge_db_free_bytes", "gauge", "Unused pages in the SQLite database")
+metrics.describe("bridge_messages_pruned_total", "counter", "Message mappings deleted by retention")
+metrics.describe("bridge_messages_stripped_total", "counter", "Message mappings whose text was dropped by retention")
+
+def _sqlite_time(days: float) -> str:
+    # Same format as CURRENT_TIMESTAMP, which fills messages.timestamp
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+def _format_mb(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} MB"
+
+class RetentionJob:
+    """Prunes old message mappings in small batches on a background thread.
+
+    Per chat the newest `keep_per_chat` mappings are always kept; older ones
+    are deleted once they are also past `keep_days`. Text and media paths
+    are only read for edit mirroring, so they are dropped after
+    `strip_text_days`. Each batch is its own short transaction, so relay
+    writes interleave with the job. Freed pages are returned to the file
+    system with incremental VACUUM.
+    """
+    def __init__(self, db_path: str, config: dict):
+        retention_cfg = config.get("retention", {})
+        history_limit = config.get("history_resend", {}).get("limit", 10)
+        self.db_path = db_path
+        # History resend reads the newest rows per chat, never prune below that
+        self.keep_per_chat = max(retention_cfg.get("keep_per_chat", 1000), history_limit)
+        self.keep_days = retention_cfg.get("keep_days", 90)
+        self.strip_text_days = retention_cfg.get("strip_text_days", 7)
+        self.batch_size = retention_cfg.get("batch_size", 500)
+        self.pause = retention_cfg.get("batch_pause", 0.05)
+        self.interval = retention_cfg.get("interval", 3600)
+        self.vacuum_pages = retention_cfg.get("vacuum_pages", 1000)
+        self.convert_auto_vacuum = retention_cfg.get("convert_auto_vacuum", False)
+        self.size_history = deque(maxlen=48) # (timestamp, size, free)
+        self._strip_cursor = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, initial_delay: float = 60):
+        self._thread = threading.Thread(target=self._run, args=(initial_delay,), name="db-retention", daemon=True)
+        self._thread.start()
+        logger.info(f"Retention enabled: keep {self.keep_per_chat} per chat and {self.keep_days} days, "
+                    f"strip text after {self.strip_text_days} days, every {self.interval}s")
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, initial_delay: float):
+        if self._stop.wait(initial_delay):
+            return
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Retention run failed: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, isolation_level=None)
+
+    def _batched(self, conn, statement: str, params: tuple) -> int:
+        """Repeat a LIMITed statement until it affects no rows; returns the total."""
+        total = 0
+        while not self._stop.is_set():
+            changed = conn.execute(statement, params + (self.batch_size,)).rowcount
+            total += changed
+            if changed < self.batch_size:
+                break
+            time.sleep(self.pause)
+        return total
+
+    def _chat_ids(self, conn):
+        # Skip scan over idx_messages_tgid_chat: one index seek per chat instead of a full scan
+        chat_id = conn.execute("SELECT MIN(dc_chat_id) FROM messages").fetchone()[0]
+        while chat_id is not None:
+            yield chat_id
+            chat_id = conn.execute("SELECT MIN(dc_chat_id) FROM messages WHERE dc_chat_id > ?", (chat_id,)).fetchone()[0]
+
+    def prune(self, conn) -> int:
+        if not self.keep_days:
+            return 0
+        cutoff_time = _sqlite_time(self.keep_days)
+        pruned = 0
+        for chat_id in list(self._chat_ids(conn)):
+            row = conn.execute("""
+                SELECT telegram_msg_id FROM messages WHERE dc_chat_id = ?
+                ORDER BY telegram_msg_id DESC LIMIT 1 OFFSET ?
+            """, (chat_id, self.keep_per_chat - 1)).fetchone()
+            if row is None:
+                continue # fewer than keep_per_chat mappings
+            pruned += self._batched(conn, """
+                DELETE FROM messages WHERE id IN (
+                    SELECT id FROM messages
+                    WHERE dc_chat_id = ? AND telegram_msg_id < ? AND timestamp < ?
+                    ORDER BY telegram_msg_id LIMIT ?
+                )
+            """, (chat_id, row[0], cutoff_time))
+        return pruned
+
+    def strip_text(self, conn) -> int:
+        if not self.strip_text_days:
+            return 0
+        cutoff_time = _sqlite_time(self.strip_text_days)
+        if self._strip_cursor is None:
+            self._strip_cursor = (conn.execute("SELECT MIN(id) FROM messages WHERE text IS NOT NULL OR media_path IS NOT NULL").fetchone()[0] or 1) - 1
+        stripped = 0
+        # ids and timestamps grow together, so walk the primary key from the last stripped row
+        while not self._stop.is_set():
+            bounds = conn.execute("""
+                SELECT MAX(id), MAX(timestamp) FROM (
+                    SELECT id, timestamp FROM messages WHERE id > ? ORDER BY id LIMIT ?
+                )
+            """, (self._strip_cursor, self.batch_size)).fetchone()
+            if bounds[0] is None:
+                break
+            changed = conn.execute("""
+                UPDATE messages SET text = NULL, media_path = NULL
+                WHERE id > ? AND id <= ? AND timestamp < ? AND (text IS NOT NULL OR media_path IS NOT NULL)
+            """, (self._strip_cursor, bounds[0], cutoff_time)).rowcount
+            stripped += changed
+            if bounds[1] is not None and bounds[1] >= cutoff_time:
+                # Batch reached rows that are too recent; continue from here next run
+                break
+            self._strip_cursor = bounds[0]
+            time.sleep(self.pause)
+        return stripped
+
+    def vacuum(self, conn) -> int:
+        """Release free pages a chunk at a time; returns the number released."""
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if mode != 2:
+            if not self.convert_auto_vacuum:
+                return 0
+            # One-off full rebuild; blocks writers for its duration
+            logger.info("Converting database to incremental auto_vacuum (one-off full VACUUM)...")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            return 0
+        released = 0
+        while not self._stop.is_set():
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not free:
+                break
+            # execute() stops after the first freed page; executescript runs the pragma to completion
+            conn.executescript(f"PRAGMA incremental_vacuum({min(free, self.vacuum_pages)})")
+            freed = free - conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if freed <= 0:
+                break
+            released += freed
+            time.sleep(self.pause)
+        return released
+
+    def sample_size(self, conn):
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size
+        size = Path(self.db_path).stat().st_size
+        self.size_history.append((time.time(), size, free))
+        metrics.set_gauge("bridge_db_size_bytes", size)
+        metrics.set_gauge("bridge_db_free_bytes", free)
+        return size, free
+
+    def run_once(self):
+        start = time.perf_counter()
+        conn = self._connect()
+        try:
+            size_before, _ = self.sample_size(conn)
+            pruned = self.prune(conn)
+            stripped = self.strip_text(conn)
+            released = self.vacuum(conn)
+            size, free = self.sample_size(conn)
+        finally:
+            conn.close()
+        metrics.inc("bridge_messages_pruned_total", pruned)
+        metrics.inc("bridge_messages_stripped_total", stripped)
+        logger.info(f"Retention: pruned {pruned} mappings, stripped text of {stripped}, released {released} pages "
+                    f"in {time.perf_counter() - start:.1f}s. Database {_format_mb(size_before)} -> {_format_mb(size)} "
+                    f"({_format_mb(free)} free)")
+
+    def format_size_history(self, limit: int = 6) -> str:
+        if not self.size_history:
+            return "Database size: not measured yet"
+        lines = ["Database size:"]
+        for ts, size, free in list(self.size_history)[-limit:]:
+            lines.append(f"  {time.strftime('%Y-%m-%d %H:%M', time.localtime(ts))}: {_format_mb(size)} ({_format_mb(free)} free)")
+        return "\n".join(lines)
@@ -0,0 +1,98 @@
+import threading
+import time
+from concurrent.futures import Future
+from logger import logger
+from metrics import metrics
+
+metrics.describe("bridge_startup_seconds", "gauge", "Seconds from start until each subsystem was ready")
+metrics.describe("bridge_startup_deferred", "gauge", "Actions waiting for the Telegram bridge to become ready")
+
+STAGES = ("db", "bridge", "dc")
+
+class Startup:
+    """Readiness of the subsystems `run_bot` brings up in parallel.
+
+    Each stage is a `concurrent.futures.Future`, so the Delta Chat thread,
+    the Telegram thread and helper threads can wait on or chain off one
+    another without polling:
+
+    - `db`: configured channels are in the channels table.
+    - `bridge`: the Telegram client is connected, the channels are resolved
+      and `bridge.loop` is set; the result is the bridge. It fails if the
+      bridge never comes up (e.g. no API credentials).
+    - `dc`: the Delta Chat event loop is about to start.
+
+    Work that needs the bridge (history fetches triggered by join events)
+    is handed to `when_bridge_ready` instead of being dropped while
+    Telethon is still connecting.
+    """
+    def __init__(self):
+        self.started = time.monotonic()
+        self.db_ready = Future()
+        self.bridge_ready = Future()
+        self.dc_ready = Future()
+        self._times = {} # stage -> seconds since start
+        self._lock = threading.Lock()
+        self._deferred = {} # key -> func(bridge), latest wins
+        for stage in STAGES:
+            self._future(stage).add_done_callback(lambda f, stage=stage: self._record(stage, f))
+        self.bridge_ready.add_done_callback(self._run_deferred)
+        metrics.register_collector(self.collect_metrics)
+
+    def _future(self, stage) -> Future:
+        return getattr(self, f"{stage}_ready")
+
+    def ready(self, stage: str, result=None):
+        future = self._future(stage)
+        if not future.done():
+            future.set_result(result)
+
+    def failed(self, stage: str, error: BaseException):
+        future = self._future(stage)
+        if not future.done():
+            future.set_exception(error)
+
+    def _record(self, stage, future):
+        elapsed = time.monotonic() - self.started
+        self._times[stage] = elapsed
+        if future.exception():
+            logger.warning(f"Startup: {stage} unavailable after {elapsed:.2f}s: {future.exception()}")
+        else:
+            logger.info(f"Startup: {stage} ready after {elapsed:.2f}s")
+
+    def when_bridge_ready(self, key, func) -> bool:
+        """Run `func(bridge)` now, or once the bridge is ready.
+
+        Deferred calls are keyed, so a burst of join events for one chat
+        results in a single call. Returns False if the bridge failed to
+        start and `func` will never run.
+        """
+        with self._lock:
+            if not self.bridge_ready.done():
+                self._deferred[key] = func
+                logger.debug(f"Telegram bridge not ready yet, deferred {key}")
+                return True
+        if self.bridge_ready.exception():
+            return False
+        func(self.bridge_ready.result())
+        return True
+
+    def _run_deferred(self, future):
+        with self._lock:
+            deferred, self._deferred = self._deferred, {}
+        if future.exception():
+            if deferred:
+                logger.warning(f"Dropping {len(deferred)} actions that waited for the Telegram bridge")
+            return
+        if deferred:
+            logger.info(f"Telegram bridge ready, running {len(deferred)} deferred actions")
+        for key, func in deferred.items():
+            try:
+                func(future.result())
+            except Exception as e:
+                logger.error(f"Deferred action {key} failed: {e}")
+
+    def collect_metrics(self):
+        for stage, elapsed in list(self._times.items()):
+            yield "bridge_startup_seconds", {"stage": stage}, elapsed
+        yield "bridge_startup_deferred", {}, len(self._deferred)
@@ -1,5 +1,7 @@
 import asyncio
 import os
+import time
+from datetime import datetime, timezone
 import logging
 from pathlib import Path
 import re
@@ -7,9 +9,16 @@ from telethon import TelegramClient, events, utils
 from telethon.tl.functions.channels import JoinChannelRequest
 from telethon.tl.functions.messages import ReadMentionsRequest, ImportChatInviteRequest, CheckChatInviteRequest, GetHistoryRequest
 from deltachat2 import MsgData, Rpc
-from logger import logger
+from logger import logger, events_enabled, log_event
 from models.message import Message
-from config_utils import save_config
+from repository.async_repository import DbWorker, AsyncMessageRepository, AsyncChannelRepository
+from config_utils import config_store
+from relay_policy import RelayPolicy
+from relay_stats import RelayStats
+from metrics import metrics
+from capture import UpdateRecorder
+from tg_session import open_session
+from bulk_import import import_channels
 
 class TelegramBridge:
     def __init__(self, config, rpc: Rpc, msg_repo=None, chan_repo=None):
@@ -22,9 +31,51 @@ class TelegramBridge:
         self.client = None
         self.msg_repo = msg_repo
         self.chan_repo = chan_repo
+        # Coroutines use the async repositories; the sync ones stay with the Delta Chat hook thread
+        repo = msg_repo or chan_repo
+        self.db_worker = DbWorker(repo.db_path) if repo else None
+        self.async_msg_repo = AsyncMessageRepository(self.db_worker, msg_repo) if msg_repo else None
+        self.async_chan_repo = AsyncChannelRepository(self.db_worker, chan_repo) if chan_repo else None
         self.media_dir = Path("data/media")
         self.media_dir.mkdir(exist_ok=True, parents=True)
         self.loop = None
+        self.startup = None # Startup of run_bot, if any
+
+        # Routing state: Telegram peer id -> channel config
+        self.tg_to_dc_map = {}
+        self.target_chats = set()
+        # Snapshot consulted by the Telethon event filters, rebuilt on routing changes
+        self._chat_filter = frozenset()
+        self.update_counts = {"handled": 0, "dropped": 0}
+        # dc_chat_id -> compiled RelayPolicy, dropped whenever channel settings change
+        self._policies = {}
+        # Bumped by invalidate_policy, so a policy compiled from settings read
+        # before an invalidation is not cached: per chat, and for all chats
+        self._policy_gens = {}
+        self._policy_gen_all = 0
+        if self.chan_repo:
+            self.chan_repo.subscribe(self.invalidate_policy)
+
+        # Edit/delete propagation
+        updates_cfg = config.get('mirror_updates', {})
+        self.mirror_edits = updates_cfg.get('edits', True)
+        self.mirror_deletions = updates_cfg.get('deletions', True)
+        self.edit_debounce = updates_cfg.get('edit_debounce', 5)
+        self.delete_delay = updates_cfg.get('delete_delay', 2)
+        self._pending_edits = {} # (dc_chat_id, tg_msg_id) -> latest edited message
+        self._edit_timers = {} # (dc_chat_id, tg_msg_id) -> asyncio.TimerHandle
+        self._pending_deletes = {} # dc_chat_id -> set of tg_msg_ids
+        self._tasks = set() # background tasks; the loop itself only keeps weak references
+
+        # Per-stage relay latency statistics
+        stats_cfg = config.get('stats', {})
+        self.stats = RelayStats(window=stats_cfg.get('window', 1024))
+        self.stats_log_interval = stats_cfg.get('log_interval', 300)
+        self.loop_lag = 0.0
+
+        # Optional recording of incoming updates for replay/load testing
+        self.capture_cfg = config.get('capture', {})
+        self.recorder = None
 
         # Device info
         self.device_model = t_config.get('device_model')
@@ -33,7 +84,8 @@ class TelegramBridge:
         self.lang_code = t_config.get('lang_code', 'en')
         self.system_lang_code = t_config.get('system_lang_code', 'en')
         
-        self.channels_to_mirror = config.get("channels_to_mirror", [])
+        # Own list: the one in config_store is only changed under config_store.edit()
+        self.channels_to_mirror = list(config.get("channels_to_mirror", []))
         if not self.channels_to_mirror and "out_channel" in config:
             self.channels_to_mirror = [config["out_channel"]]
 
@@ -117,8 +169,8 @@ class TelegramBridge:
             actual_tg_id = utils.get_peer_id(entity)
             if channel_cfg.get('tgid') != actual_tg_id:
                 logger.info(f"Updating tgid for {target_chat}: {channel_cfg.get('tgid')} -> {actual_tg_id}")
-                channel_cfg['tgid'] = actual_tg_id
-                save_config(self.config)
+                with config_store.edit():
+                    channel_cfg['tgid'] = actual_tg_id
 
             if sync_info_now or photo_mode == 'auto':
                 await self.sync_channel_info(entity, dc_chat_id, accid)
@@ -134,36 +186,37 @@ class TelegramBridge:
             return
 
         logger.info("Starting Telegram client (Bridge)...")
-        self.client = TelegramClient(
-            'data/deltabot', 
-            self.api_id, 
-            self.api_hash,
-            device_model=self.device_model,
-            system_version=self.system_version,
-            app_version=self.app_version,
-            lang_code=self.lang_code,
-            system_lang_code=self.system_lang_code
-        )
-        
+        if self.client is None:
+            self.client = create_client(self.config)
+        # No new handshake if a caller handed over a connected client
         await self.client.start(phone=self.phone)
         self.loop = asyncio.get_running_loop()
+        metrics.register_collector(self.collect_metrics)
+        if self.capture_cfg.get('enabled'):
+            self.recorder = UpdateRecorder(self.capture_cfg.get('file', 'data/capture.jsonl'))
+            logger.info(f"Capturing Telegram updates to {self.recorder.path}")
         
         accid = self.config.get('active_accid')
         
         self.tg_to_dc_map = {}
-        self.target_chats = []
+        self.target_chats = set()
 
         for channel_cfg in self.channels_to_mirror:
-            dc_chat_id = channel_cfg.get('chat_id')
             actual_tg_id = await self._resolve_and_join_channel(channel_cfg, accid)
             if actual_tg_id:
                 self.tg_to_dc_map[actual_tg_id] = channel_cfg
-                self.target_chats.append(actual_tg_id)
+                self.target_chats.add(actual_tg_id)
+        self._rebuild_chat_filter()
 
         if not self.target_chats:
             logger.error("No valid Telegram channels to mirror.")
             # We still want to run even if empty, as we might add dynamically
             # return 
+
+        if self.startup:
+            # Relaying looks up the channels table, which run_bot fills meanwhile
+            await asyncio.wrap_future(self.startup.db_ready)
+            self.startup.ready("bridge", self)
             
         await self.start_listening(accid)
 
@@ -193,13 +246,25 @@ class TelegramBridge:
         except Exception as e:
             logger.warning(f"General error in sync_channel_info: {e}")
 
+    def _rebuild_chat_filter(self):
+        """Refresh the chat id snapshot used to filter Telethon updates."""
+        self._chat_filter = frozenset(self.target_chats)
+        logger.debug(f"Telegram chat filter rebuilt with {len(self._chat_filter)} chats.")
+
+    def _accept_update(self, event):
+        """Telethon event filter: drop updates from unrelated chats before dispatch."""
+        if event.chat_id in self._chat_filter:
+            self.update_counts["handled"] += 1
+            return True
+        self.update_counts["dropped"] += 1
+        return False
+
     async def start_listening(self, accid):
-        @self.client.on(events.ChatAction())
+        # The filter runs inside Telethon's dispatcher, so updates from chats we
+        # do not mirror never get a handler task scheduled.
+        @self.client.on(events.ChatAction(func=self._accept_update))
         async def chat_action_handler(event):
             tg_id = event.chat_id
-            if tg_id not in self.target_chats:
-                return
-
             if event.new_photo or event.new_title:
                 try:
                     channel_cfg = self.tg_to_dc_map.get(tg_id)
@@ -211,41 +276,184 @@ class TelegramBridge:
                 except Exception as e:
                     logger.error(f"Error handling real-time Telegram update: {e}")
 
-        @self.client.on(events.NewMessage())
+        @self.client.on(events.NewMessage(func=self._accept_update))
         async def handler(event):
             try:
                 tg_id = event.chat_id
-                if tg_id not in self.target_chats:
-                    return
-
                 channel_cfg = self.tg_to_dc_map.get(tg_id)
                 if not channel_cfg:
                     return
                 
+                if self.recorder:
+                    self.recorder.record_message("new", event.message, tg_id)
+                if event.message.date:
+                    lag = (datetime.now(timezone.utc) - event.message.date).total_seconds()
+                    self.stats.record(channel_cfg.get('chat_id'), "receive_lag", lag)
                 await self.client.send_read_acknowledge(event.chat_id, event.message)
                 await self._relay_message(event.message, channel_cfg, accid)
                         
             except Exception as e:
                 logger.error(f"Error in Telegram handler: {e}")
 
+        if self.mirror_edits:
+            @self.client.on(events.MessageEdited(func=self._accept_update))
+            async def edit_handler(event):
+                channel_cfg = self.tg_to_dc_map.get(event.chat_id)
+                if self.recorder:
+                    self.recorder.record_message("edit", event.message, event.chat_id)
+                if channel_cfg:
+                    self._schedule_edit(event.message, channel_cfg, accid)
+
+        if self.mirror_deletions:
+            @self.client.on(events.MessageDeleted(func=self._accept_update))
+            async def delete_handler(event):
+                channel_cfg = self.tg_to_dc_map.get(event.chat_id)
+                if self.recorder:
+                    self.recorder.record_deletion(event.deleted_ids, event.chat_id)
+                if channel_cfg:
+                    self._schedule_delete(event.deleted_ids, channel_cfg, accid)
+
+        if self.stats_log_interval:
+            self._spawn(self._log_stats_periodically())
+        self._spawn(self._monitor_loop_lag())
+
         logger.info(f"Telegram bridge is listening on {len(self.target_chats)} channels...")
-        await self.client.run_until_disconnected()
+        try:
+            await self.client.run_until_disconnected()
+        finally:
+            if self.recorder:
+                self.recorder.close()
+                logger.info(f"Captured {self.recorder.count} Telegram updates to {self.recorder.path}")
+            logger.info(f"Telegram updates handled: {self.update_counts['handled']}, dropped: {self.update_counts['dropped']}")
+            if self.db_worker:
+                self.db_worker.stop()
+
+    def _spawn(self, coro):
+        """Run a coroutine in the background, keeping a reference and logging its failure."""
+        task = self.loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Background task {task.get_coro().__qualname__} failed: {task.exception()!r}")
+
+    async def _monitor_loop_lag(self, interval=1.0):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.loop_lag = max(0.0, time.perf_counter() - start - interval)
+
+    def collect_metrics(self):
+        """Derived gauges for the metrics endpoint, evaluated on scrape."""
+        yield "bridge_mirrored_channels", {}, len(self.target_chats)
+        yield "bridge_pending_edits", {}, len(self._pending_edits)
+        yield "bridge_pending_deletes", {}, sum(len(ids) for ids in list(self._pending_deletes.values()))
+        yield "bridge_event_loop_lag_seconds", {}, self.loop_lag
+        for result, count in list(self.update_counts.items()):
+            yield "bridge_telegram_updates_total", {"result": result}, count
+        for dc_chat_id, stages in self.stats.summary().items():
+            for stage, (count, p50, p95, p99) in stages.items():
+                for quantile, value in (("0.5", p50), ("0.95", p95), ("0.99", p99)):
+                    yield "bridge_stage_latency_seconds", {"channel": dc_chat_id, "stage": stage, "quantile": quantile}, value
+
+    async def _log_stats_periodically(self):
+        while True:
+            await asyncio.sleep(self.stats_log_interval)
+            logger.info(f"Relay latency summary:\n{self.stats.format_summary()}")
+
+    def _schedule_edit(self, message, channel_cfg, accid):
+        """Debounce edits per message so a burst of edits becomes one Delta Chat update."""
+        key = (channel_cfg.get('chat_id'), message.id)
+        self._pending_edits[key] = message
+        timer = self._edit_timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        self._edit_timers[key] = self.loop.call_later(
+            self.edit_debounce, lambda: self._spawn(self._flush_edit(key, channel_cfg, accid)))
+
+    async def _flush_edit(self, key, channel_cfg, accid):
+        self._edit_timers.pop(key, None)
+        message = self._pending_edits.pop(key, None)
+        if message is None or not self.async_msg_repo:
+            return
+
+        dc_chat_id, tg_msg_id = key
+        try:
+            existing = await self.async_msg_repo.get_by_telegram_id(tg_msg_id, dc_chat_id, with_text=True)
+            if not existing or not existing.dc_msg_id:
+                logger.debug(f"Edited message {tg_msg_id} was never relayed to DC {dc_chat_id}, ignoring edit.")
+                return
+
+            policy = await self.get_policy(channel_cfg, accid)
+            if not policy.enabled:
+                return
+            text = policy.render_text(message)
+            if not text or text == existing.text:
+                return
+
+            logger.info(f"Mirroring edit of Telegram message {tg_msg_id} to DC message {existing.dc_msg_id}")
+            self.rpc.send_edit_request(accid, existing.dc_msg_id, text)
+            await self.async_msg_repo.update_text(tg_msg_id, dc_chat_id, text)
+        except Exception as e:
+            logger.error(f"Failed to mirror edit of message {tg_msg_id} to Delta Chat: {e}")
+
+    def _schedule_delete(self, deleted_ids, channel_cfg, accid):
+        """Collect deletions per chat and flush them in a single RPC call."""
+        dc_chat_id = channel_cfg.get('chat_id')
+        pending = self._pending_deletes.get(dc_chat_id)
+        if pending is None:
+            pending = self._pending_deletes[dc_chat_id] = set()
+            self.loop.call_later(self.delete_delay, lambda: self._spawn(self._flush_deletes(dc_chat_id, accid)))
+        pending.update(deleted_ids)
+
+        # A deleted message has nothing left to edit
+        for tg_msg_id in deleted_ids:
+            key = (dc_chat_id, tg_msg_id)
+            self._pending_edits.pop(key, None)
+            timer = self._edit_timers.pop(key, None)
+            if timer:
+                timer.cancel()
+
+    async def _flush_deletes(self, dc_chat_id, accid):
+        tg_msg_ids = list(self._pending_deletes.pop(dc_chat_id, ()))
+        if not tg_msg_ids or not self.async_msg_repo:
+            return
+
+        try:
+            mapped = await self.async_msg_repo.get_by_telegram_ids(tg_msg_ids, dc_chat_id)
+            dc_msg_ids = [m.dc_msg_id for m in mapped if m.dc_msg_id]
+            if dc_msg_ids:
+                logger.info(f"Mirroring deletion of {len(dc_msg_ids)} messages to DC {dc_chat_id}")
+                self.rpc.delete_messages(accid, dc_msg_ids)
+            await self.async_msg_repo.delete_by_telegram_ids([m.telegram_msg_id for m in mapped], dc_chat_id)
+        except Exception as e:
+            logger.error(f"Failed to mirror deletions to Delta Chat {dc_chat_id}: {e}")
 
     async def add_dynamic_channel(self, channel_cfg, accid):
         """Dynamically add a channel to mirror without restarting."""
         actual_tg_id = await self._resolve_and_join_channel(channel_cfg, accid)
         if actual_tg_id:
             if actual_tg_id not in self.target_chats:
-                self.target_chats.append(actual_tg_id)
-                self.tg_to_dc_map[actual_tg_id] = channel_cfg
-                # Keep channels_to_mirror in sync for fetch_history
-                if channel_cfg not in self.channels_to_mirror:
-                    self.channels_to_mirror.append(channel_cfg)
-                logger.info(f"Dynamically added channel {actual_tg_id} to listening list.")
+                self.register_channels([(actual_tg_id, channel_cfg)])
             else:
                 logger.info(f"Channel {actual_tg_id} is already being mirrored.")
         return actual_tg_id
 
+    def register_channels(self, resolved):
+        """Start listening on already resolved (tg_id, channel_cfg) pairs."""
+        for tg_id, channel_cfg in resolved:
+            self.target_chats.add(tg_id)
+            self.tg_to_dc_map[tg_id] = channel_cfg
+            self.invalidate_policy(dc_chat_id=channel_cfg.get('chat_id'))
+            # Keep channels_to_mirror in sync for fetch_history
+            if channel_cfg not in self.channels_to_mirror:
+                self.channels_to_mirror.append(channel_cfg)
+            logger.info(f"Dynamically added channel {tg_id} to listening list.")
+        self._rebuild_chat_filter()
+
     async def remove_dynamic_channel(self, dc_chat_id):
         """Stop mirroring a channel."""
         tg_id_to_remove = None
@@ -255,126 +463,125 @@ class TelegramBridge:
                 break
         
         if tg_id_to_remove:
-            self.target_chats.remove(tg_id_to_remove)
+            self.target_chats.discard(tg_id_to_remove)
             del self.tg_to_dc_map[tg_id_to_remove]
+            self._rebuild_chat_filter()
+            self.invalidate_policy(dc_chat_id=dc_chat_id)
             # Remove from local list too
             self.channels_to_mirror = [c for c in self.channels_to_mirror if c.get('chat_id') != dc_chat_id]
             logger.info(f"Dynamically removed channel {tg_id_to_remove} (DC: {dc_chat_id}) from listening list.")
             return True
         return False
 
+    def replace_channel_config(self, channel_cfg):
+        """Swap in a reloaded config for a channel whose Telegram source is unchanged."""
+        dc_chat_id = channel_cfg.get('chat_id')
+        for tg_id, cfg in self.tg_to_dc_map.items():
+            if cfg.get('chat_id') == dc_chat_id:
+                if cfg.get('tgid') and not channel_cfg.get('tgid'):
+                    with config_store.edit():
+                        channel_cfg['tgid'] = cfg['tgid']
+                self.tg_to_dc_map[tg_id] = channel_cfg
+        self.channels_to_mirror = [channel_cfg if c.get('chat_id') == dc_chat_id else c for c in self.channels_to_mirror]
+        self.invalidate_policy(dc_chat_id=dc_chat_id)
+
+    def invalidate_policy(self, accid=None, dc_chat_id=None):
+        """Drop compiled relay policies so they are rebuilt from current settings."""
+        if dc_chat_id is None:
+            self._policy_gen_all += 1
+            self._policies.clear()
+        else:
+            self._policy_gens[dc_chat_id] = self._policy_gens.get(dc_chat_id, 0) + 1
+            self._policies.pop(dc_chat_id, None)
+
+    def _policy_generation(self, dc_chat_id):
+        return self._policy_gen_all, self._policy_gens.get(dc_chat_id, 0)
+
+    async def get_policy(self, channel_cfg, accid):
+        dc_chat_id = channel_cfg.get('chat_id')
+        policy = self._policies.get(dc_chat_id)
+        if policy is None:
+            generation = self._policy_generation(dc_chat_id)
+            chan = await self.async_chan_repo.get_by_chat_id(accid, dc_chat_id) if self.async_chan_repo else None
+            policy = RelayPolicy.compile(channel_cfg, chan)
+            # Settings changed during the lookup: use this policy once, but do not cache it
+            if self._policy_generation(dc_chat_id) == generation:
+                self._policies[dc_chat_id] = policy
+        return policy
+
     async def _relay_message(self, message, channel_cfg, accid):
         try:
             dc_chat_id = channel_cfg.get('chat_id')
             if not dc_chat_id:
                 return None
-            
-            # Default from config
-            photo_cfg = channel_cfg.get('photo', {})
-            photo_enabled = photo_cfg.get('enable', True)
-            photo_prefix = photo_cfg.get('message', '[Photo]')
-            
-            video_cfg = channel_cfg.get('video', {})
-            video_enabled = video_cfg.get('enable', True)
-            video_prefix = video_cfg.get('message', '[Video]')
-
-            # Override with DB settings if available
-            if self.chan_repo:
-                chan = self.chan_repo.get_by_chat_id(accid, dc_chat_id)
-                if chan:
-                    if not chan.enabled:
-                        logger.debug(f"Relay disabled for channel {dc_chat_id}, skipping message.")
-                        return None
-                    photo_enabled = chan.photo_enabled
-                    photo_prefix = chan.photo_message
-                    video_enabled = chan.video_enabled
-                    video_prefix = chan.video_message
-
-            text = message.message or ""
+
+            stats = self.stats
+            # Per-message stage timings, only collected for the structured event log
+            timings = {} if events_enabled() else None
+            media_bytes = 0
+            relay_start = time.perf_counter()
+            with stats.span(dc_chat_id, "db_lookup", timings):
+                policy = await self.get_policy(channel_cfg, accid)
+            if not policy.enabled:
+                logger.debug(f"Relay disabled for channel {dc_chat_id}, skipping message.")
+                metrics.inc("bridge_messages_skipped_total", channel=dc_chat_id, reason="disabled")
+                return None
+
             media_path = None
-            media_type = "text"
-            
-            if message.photo:
-                media_type = "image"
-                if photo_enabled:
-                    media_path = await message.download_media(file=str(self.media_dir))
-                else:
-                    text = f"{photo_prefix} {text}" if text else photo_prefix
-            elif message.video:
-                media_type = "video"
-                if video_enabled:
+            media_type, download = policy.media_plan(message)
+            if download:
+                with stats.span(dc_chat_id, "download", timings):
                     media_path = await message.download_media(file=str(self.media_dir))
-                else:
-                    text = f"{video_prefix} {text}" if text else video_prefix
-            elif message.file:
-                # Handle other file types (stickers, documents, audio, etc.)
-                media_path = await message.download_media(file=str(self.media_dir))
-                media_type = "file"
-            
-            # Extract extra links (e.g., from buttons or formatted links)
-            extra_links = []
-            if message.entities:
-                for entity in message.entities:
-                    url = getattr(entity, 'url', None)
-                    if url and url not in extra_links and url not in text:
-                        extra_links.append(url)
-            
-            if message.buttons:
-                for row in message.buttons:
-                    for button in row:
-                        url = getattr(button, 'url', None)
-                        if url and url not in extra_links and url not in text:
-                            extra_links.append(url)
-
-            wp = getattr(message, 'web_preview', None)
-            if wp:
-                url = getattr(wp, 'url', None)
-                if url and url not in extra_links and url not in text:
-                    extra_links.append(url)
-
-            if extra_links:
-                links_text = "\n".join(extra_links)
-                if text:
-                    text = f"{text}\n\n{links_text}"
-                else:
-                    text = links_text
+                if media_path:
+                    media_bytes = os.path.getsize(media_path)
+                    stats.add_bytes(dc_chat_id, media_bytes)
+                    metrics.inc("bridge_download_bytes_total", media_bytes, channel=dc_chat_id)
+            text = policy.render_text(message)
             
             if not (text or media_path):
                 logger.debug(f"Skipping message {message.id} - no supported content (text or media)")
+                metrics.inc("bridge_messages_skipped_total", channel=dc_chat_id, reason="no_content")
                 return None
 
-            sender = await message.get_sender()
+            with stats.span(dc_chat_id, "sender_lookup", timings):
+                sender = await message.get_sender()
             sender_name = utils.get_display_name(sender) if sender else None
             
             # Handle replies/quotes
             quoted_message_id = None
             reply_to_msg_id = message.reply_to_msg_id
-            if reply_to_msg_id and self.msg_repo:
-                quoted_msg = self.msg_repo.get_by_telegram_id(reply_to_msg_id, dc_chat_id)
+            if reply_to_msg_id and self.async_msg_repo:
+                with stats.span(dc_chat_id, "db_lookup", timings):
+                    quoted_msg = await self.async_msg_repo.get_by_telegram_id(reply_to_msg_id, dc_chat_id)
                 if quoted_msg:
                     quoted_message_id = quoted_msg.dc_msg_id
             
-            logger.info(f"Relaying from Telegram to DC {dc_chat_id}: {text[:30] if text else '[Media]'}...")
+            logger.info("Relaying from Telegram to DC %s: %s...", dc_chat_id, text[:30] if text else '[Media]')
             
             dc_msg_id = None
             try:
-                if media_path:
-                    dc_msg_id = self.rpc.send_msg(accid, dc_chat_id, MsgData(
-                        text=text, 
-                        file=str(Path(media_path).absolute()), 
-                        override_sender_name=sender_name,
-                        quoted_message_id=quoted_message_id
-                    ))
-                else:
-                    dc_msg_id = self.rpc.send_msg(accid, dc_chat_id, MsgData(
-                        text=text, 
-                        override_sender_name=sender_name,
-                        quoted_message_id=quoted_message_id
-                    ))
+                with stats.span(dc_chat_id, "send_msg", timings):
+                    if media_path:
+                        dc_msg_id = self.rpc.send_msg(accid, dc_chat_id, MsgData(
+                            text=text, 
+                            file=str(Path(media_path).absolute()), 
+                            override_sender_name=sender_name,
+                            quoted_message_id=quoted_message_id
+                        ))
+                    else:
+                        dc_msg_id = self.rpc.send_msg(accid, dc_chat_id, MsgData(
+                            text=text, 
+                            override_sender_name=sender_name,
+                            quoted_message_id=quoted_message_id
+                        ))
             except Exception as e:
                 logger.error(f"Failed to relay message to Delta Chat: {e}", exc_info=(logger.level <= logging.DEBUG))
+                metrics.inc("bridge_messages_failed_total", channel=dc_chat_id)
+                if timings is not None:
+                    log_event("relay_failed", stage="send_msg", tg_chat=channel_cfg.get('tgid'), tg_msg_id=message.id,
+                              dc_chat=dc_chat_id, error=str(e))
 
-            if dc_msg_id and self.msg_repo:
+            if dc_msg_id and self.async_msg_repo:
                 db_msg = Message(
                     telegram_msg_id=message.id,
                     dc_msg_id=dc_msg_id,
@@ -383,10 +590,23 @@ class TelegramBridge:
                     media_path=media_path,
                     media_type=media_type
                 )
-                self.msg_repo.save(db_msg)
+                with stats.span(dc_chat_id, "save_mapping", timings):
+                    await self.async_msg_repo.save(db_msg)
+            if dc_msg_id:
+                metrics.inc("bridge_messages_relayed_total", channel=dc_chat_id)
+            total = time.perf_counter() - relay_start
+            stats.record(dc_chat_id, "total", total)
+            if dc_msg_id and timings is not None:
+                timings["total"] = total
+                log_event("relay", tg_chat=channel_cfg.get('tgid'), tg_msg_id=message.id, dc_chat=dc_chat_id,
+                          dc_msg_id=dc_msg_id, media_type=media_type, media_bytes=media_bytes,
+                          timings_ms={stage: round(seconds * 1000, 2) for stage, seconds in timings.items()})
             return dc_msg_id
         except Exception as e:
             logger.error(f"Error in _relay_message: {e}")
+            if events_enabled():
+                log_event("relay_failed", stage="relay", tg_chat=channel_cfg.get('tgid'), tg_msg_id=getattr(message, 'id', None),
+                          dc_chat=channel_cfg.get('chat_id'), error=str(e))
             return None
 
     async def fetch_history(self, tgid, limit=10, accid=None):
@@ -420,9 +640,8 @@ class TelegramBridge:
             return
         
         dc_chat_id = channel_cfg.get('chat_id')
-        if dc_chat_id and self.chan_repo:
-            chan = self.chan_repo.get_by_chat_id(accid, dc_chat_id)
-            if chan and not chan.enabled:
+        if dc_chat_id:
+            if not (await self.get_policy(channel_cfg, accid)).enabled:
                 logger.info(f"History fetch disabled for channel {dc_chat_id}, skipping.")
                 return
 
@@ -467,12 +686,20 @@ class TelegramBridge:
                     try:
                         self.rpc.resend_messages(accid, pending_resend_ids)
                         count += len(pending_resend_ids)
+                        metrics.inc("bridge_history_resent_total", len(pending_resend_ids), channel=dc_chat_id)
+                        if events_enabled():
+                            log_event("resend", source="history_fetch", tg_chat=tgid, dc_chat=dc_chat_id, dc_msg_ids=list(pending_resend_ids))
                     except Exception as e:
                         logger.warning(f"Failed to resend batch for {tgid}: {e}")
                     pending_resend_ids.clear()
 
+            mapped = {}
+            if self.async_msg_repo and tg_messages:
+                found = await self.async_msg_repo.get_by_telegram_ids([msg.id for msg in tg_messages], dc_chat_id)
+                mapped = {m.telegram_msg_id: m for m in found}
+
             for msg in tg_messages:
-                existing = self.msg_repo.get_by_telegram_id(msg.id, dc_chat_id) if self.msg_repo else None
+                existing = mapped.get(msg.id)
                 valid_id = None
                 if existing and existing.dc_msg_id and existing.dc_chat_id == dc_chat_id:
                     try:
@@ -499,13 +726,39 @@ class TelegramBridge:
         except Exception as e:
             logger.error(f"Failed to fetch history for {tgid}: {e}")
 
-def start_telegram_bridge(config, rpc, msg_repo=None, chan_repo=None, bridge_container=None):
+def start_telegram_bridge(config, rpc, msg_repo=None, chan_repo=None, bridge_container=None, capture_file=None, startup=None):
     bridge = TelegramBridge(config, rpc, msg_repo, chan_repo)
+    bridge.startup = startup
+    if capture_file:
+        bridge.capture_cfg = {'enabled': True, 'file': capture_file}
     if bridge_container is not None:
         bridge_container['bridge'] = bridge
-    asyncio.run(bridge.run())
+    try:
+        asyncio.run(bridge.run())
+    except Exception as e:
+        if startup:
+            startup.failed("bridge", e)
+        raise
+    finally:
+        if startup:
+            # run() returned before the bridge came up, e.g. without API credentials
+            startup.failed("bridge", RuntimeError("Telegram bridge stopped"))
+
+def create_client(config) -> TelegramClient:
+    """TelegramClient for the configured session store and device info."""
+    t_config = config.get('telegram', {})
+    return TelegramClient(
+        open_session(config),
+        t_config.get('api_id'),
+        t_config.get('api_hash'),
+        device_model=t_config.get('device_model'),
+        system_version=t_config.get('system_version'),
+        app_version=t_config.get('app_version'),
+        lang_code=t_config.get('lang_code', 'en'),
+        system_lang_code=t_config.get('system_lang_code', 'en')
+    )
 
-async def init_telegram_session_async(config):
+async def init_telegram_session_async(config, client=None):
     t_config = config.get('telegram', {})
     api_id = t_config.get('api_id')
     api_hash = t_config.get('api_hash')
@@ -516,25 +769,16 @@ async def init_telegram_session_async(config):
         return False
         
     logger.info("Initializing Telegram session...")
-    client = TelegramClient(
-        'data/deltabot', 
-        api_id, 
-        api_hash,
-        device_model=t_config.get('device_model'),
-        system_version=t_config.get('system_version'),
-        app_version=t_config.get('app_version'),
-        lang_code=t_config.get('lang_code', 'en'),
-        system_lang_code=t_config.get('system_lang_code', 'en')
-    )
+    own_client = client is None
+    if own_client:
+        client = create_client(config)
     await client.start(phone=phone)
     logger.info("Telegram session initialized successfully.")
-    await client.disconnect()
+    if own_client:
+        await client.disconnect()
     return True
 
-def init_telegram_session(config):
-    return asyncio.run(init_telegram_session_async(config))
-
-async def sync_tg_info_to_dc_async(config, rpc):
+async def sync_tg_info_to_dc_async(config, rpc, client=None):
     t_config = config.get('telegram', {})
     api_id = t_config.get('api_id')
     api_hash = t_config.get('api_hash')
@@ -542,23 +786,50 @@ async def sync_tg_info_to_dc_async(config, rpc):
     if not api_id or not api_hash:
         return
 
-    async with TelegramClient(
-        'data/deltabot', 
-        api_id, 
-        api_hash,
-        device_model=t_config.get('device_model'),
-        system_version=t_config.get('system_version'),
-        app_version=t_config.get('app_version'),
-        lang_code=t_config.get('lang_code', 'en'),
-        system_lang_code=t_config.get('system_lang_code', 'en')
-    ) as client:
+    if client is None:
+        async with create_client(config) as client:
+            return await sync_tg_info_to_dc_async(config, rpc, client)
+
+    bridge = TelegramBridge(config, rpc)
+    bridge.client = client
+    
+    accid = config.get('active_accid')
+    for channel_cfg in bridge.channels_to_mirror:
+        await bridge._resolve_and_join_channel(channel_cfg, accid, sync_info_now=True)
+
+async def init_telegram_async(config, rpc):
+    """`--init`: log in and sync channel names/photos over one connection."""
+    t_config = config.get('telegram', {})
+    if not t_config.get('api_id') or not t_config.get('api_hash'):
+        logger.error("Telegram API ID or Hash not provided in config.yml.")
+        return False
+
+    client = create_client(config)
+    try:
+        if await init_telegram_session_async(config, client):
+            await sync_tg_info_to_dc_async(config, rpc, client)
+    finally:
+        await client.disconnect()
+
+def init_telegram(config, rpc):
+    asyncio.run(init_telegram_async(config, rpc))
+
+async def import_channels_async(config, rpc, chan_repo, accid, items):
+    t_config = config.get('telegram', {})
+    api_id = t_config.get('api_id')
+    api_hash = t_config.get('api_hash')
+
+    if not api_id or not api_hash:
+        logger.error("Telegram API ID or Hash not provided in config.yml.")
+        return []
+
+    async with create_client(config) as client:
         bridge = TelegramBridge(config, rpc)
         bridge.client = client
-        
-        accid = config.get('active_accid')
-        for channel_cfg in bridge.channels_to_mirror:
-            await bridge._resolve_and_join_channel(channel_cfg, accid, sync_info_now=True)
+        concurrency = config.get('bulk_import', {}).get('concurrency', 8)
+        return await import_channels(bridge, chan_repo, accid, items, concurrency)
 
-def sync_tg_info_to_dc(config, rpc):
-    asyncio.run(sync_tg_info_to_dc_async(config, rpc))
+def import_channels_offline(config, rpc, chan_repo, accid, items):
+    """`--import`: bulk import with a short-lived Telegram client while the bot is stopped."""
+    return asyncio.run(import_channels_async(config, rpc, chan_repo, accid, items))
 
@@ -0,0 +1,128 @@
+import os
+import sqlite3
+import time
+from telethon.sessions import SQLiteSession
+from logger import logger
+
+SESSION_FILE = "data/deltabot.session"
+SHARED_DB = "data/db.sqlite"
+SESSION_TABLES = ("version", "sessions", "entities", "sent_files", "update_state")
+
+class BridgeSession(SQLiteSession):
+    """Telethon's SQLite session with WAL and batched entity writes.
+
+    The stock session writes every batch of entities Telethon sees into an
+    open rollback-journal transaction and commits it about once a minute,
+    so each commit is a couple of fsyncs and the write lock is held in
+    between. Here the connection runs in WAL mode with `synchronous=NORMAL`
+    and autocommit. Entities are collected in memory, deduplicated by id
+    and written in one transaction when `entity_batch` of them are pending,
+    when Telethon saves the session, or before an entity lookup.
+
+    With `shared=True` the tables live in the bridge database instead of a
+    separate file; Telethon's table names do not clash with ours.
+    """
+    def __init__(self, path: str = SESSION_FILE, entity_batch: int = 500, shared: bool = False):
+        # SQLiteSession would append ".session" to the shared database's name
+        self._path = path
+        self.shared = shared
+        self.entity_batch = entity_batch
+        self._pending_entities = {} # id -> entities row
+        if shared:
+            _import_session_file(path, SESSION_FILE)
+        super().__init__(path)
+        self.filename = path
+
+    def _cursor(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self._path, check_same_thread=False, timeout=30, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        return self._conn.cursor()
+
+    def process_entities(self, tlo):
+        if not self.save_entities:
+            return
+        rows = self._entities_to_rows(tlo)
+        if not rows:
+            return
+        now = int(time.time())
+        for row in rows:
+            self._pending_entities[row[0]] = row + (now,)
+        if len(self._pending_entities) >= self.entity_batch:
+            self._flush_entities()
+
+    def _flush_entities(self):
+        if not self._pending_entities:
+            return
+        rows, self._pending_entities = list(self._pending_entities.values()), {}
+        conn = self._cursor().connection
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany("insert or replace into entities values (?,?,?,?,?,?)", rows)
+
+    def save(self):
+        self._flush_entities()
+        super().save()
+
+    def close(self):
+        self._flush_entities()
+        super().close()
+
+    def delete(self):
+        if not self.shared:
+            return super().delete()
+        # Log out clears the session tables, never the bridge database itself
+        self._pending_entities = {}
+        conn = self._cursor().connection
+        with conn:
+            conn.execute("BEGIN")
+            for table in SESSION_TABLES[1:]:
+                conn.execute(f"DELETE FROM {table}")
+        return True
+
+    def get_entity_rows_by_phone(self, phone):
+        self._flush_entities()
+        return super().get_entity_rows_by_phone(phone)
+
+    def get_entity_rows_by_username(self, username):
+        self._flush_entities()
+        return super().get_entity_rows_by_username(username)
+
+    def get_entity_rows_by_name(self, name):
+        self._flush_entities()
+        return super().get_entity_rows_by_name(name)
+
+    def get_entity_rows_by_id(self, id, exact=True):
+        self._flush_entities()
+        return super().get_entity_rows_by_id(id, exact)
+
+def _import_session_file(db_path: str, session_file: str):
+    """Copy an existing session file into the shared database once, so
+    switching `session_store` does not require logging in again."""
+    if not os.path.exists(session_file):
+        return
+    conn = sqlite3.connect(db_path)
+    try:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sessions'").fetchone():
+            return
+        conn.execute("ATTACH DATABASE ? AS legacy", (session_file,))
+        tables = conn.execute(
+            f"SELECT name, sql FROM legacy.sqlite_master WHERE type = 'table' AND name IN ({','.join('?' * len(SESSION_TABLES))})",
+            SESSION_TABLES,
+        ).fetchall()
+        with conn:
+            for name, sql in tables:
+                conn.execute(sql)
+                conn.execute(f"INSERT INTO main.{name} SELECT * FROM legacy.{name}")
+    finally:
+        conn.close()
+    logger.info(f"Imported Telegram session from {session_file} into {db_path}")
+
+def open_session(config: dict) -> BridgeSession:
+    """The Telethon session selected by `telegram.session_store` (file or database)."""
+    t_config = config.get('telegram', {})
+    batch = t_config.get('entity_batch', 500)
+    if t_config.get('session_store', 'file') == 'database':
+        return BridgeSession(SHARED_DB, entity_batch=batch, shared=True)
+    return BridgeSession(SESSION_FILE, entity_batch=batch)
@@ -0,0 +1,185 @@
+"""In-process stand-ins for Telethon and the Delta Chat RPC used by the benchmarks."""
+import asyncio
+import itertools
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+from telethon.tl.types import User
+
+class FakeRpc:
+    """Implements the subset of deltachat2.Rpc the bridge calls, with optional latency."""
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = {}
+        self._msg_ids = itertools.count(1000)
+        self._chat_ids = itertools.count(100)
+        self.messages = {} # dc_msg_id -> (chat_id, MsgData)
+
+    def _call(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def send_msg(self, accid, chat_id, data):
+        self._call("send_msg")
+        msg_id = next(self._msg_ids)
+        self.messages[msg_id] = (chat_id, data)
+        return msg_id
+
+    def resend_messages(self, accid, msg_ids):
+        self._call("resend_messages")
+
+    def get_message(self, accid, msg_id):
+        self._call("get_message")
+        if msg_id not in self.messages:
+            raise KeyError(msg_id)
+        chat_id, data = self.messages[msg_id]
+        return {"id": msg_id, "chat_id": chat_id, "text": data.text}
+
+    def get_existing_msg_ids(self, accid, msg_ids):
+        self._call("get_existing_msg_ids")
+        return [m for m in msg_ids if m in self.messages]
+
+    def get_message_info(self, accid, msg_id):
+        self._call("get_message_info")
+        return "bench: no details"
+
+    def delete_messages(self, accid, msg_ids):
+        self._call("delete_messages")
+        for msg_id in msg_ids:
+            self.messages.pop(msg_id, None)
+
+    def send_edit_request(self, accid, msg_id, text):
+        self._call("send_edit_request")
+
+    def get_chat_contacts(self, accid, chat_id):
+        self._call("get_chat_contacts")
+        return [1, 2, 3]
+
+    def accept_chat(self, accid, chat_id):
+        self._call("accept_chat")
+
+    def marknoticed_chat(self, accid, chat_id):
+        self._call("marknoticed_chat")
+
+    def get_chat_securejoin_qr_code(self, accid, chat_id):
+        self._call("get_chat_securejoin_qr_code")
+        return f"https://i.delta.chat/#BENCH{chat_id}"
+
+    def create_broadcast(self, accid, name):
+        self._call("create_broadcast")
+        return next(self._chat_ids)
+
+    def get_all_account_ids(self):
+        return [1]
+
+    def __getattr__(self, name):
+        # Anything else (set_config, set_chat_visibility, ...) is a no-op RPC
+        def call(*args, **kwargs):
+            self._call(name)
+        return call
+
+class FakeMessage:
+    """Mimics the parts of telethon's Message that the relay path reads."""
+    def __init__(self, msg_id, chat_id, text="", photo=False, video=False, media_size=0,
+                 grouped_id=None, reply_to_msg_id=None, entities=None, buttons=None, download_latency=0.0):
+        self.id = msg_id
+        self.chat_id = chat_id
+        self.message = text
+        self.photo = SimpleNamespace(size=media_size) if photo else None
+        self.video = SimpleNamespace(size=media_size) if video else None
+        self.file = SimpleNamespace(size=media_size) if (photo or video) else None
+        self.grouped_id = grouped_id
+        self.reply_to_msg_id = reply_to_msg_id
+        self.entities = entities
+        self.buttons = buttons
+        self.web_preview = None
+        self.date = datetime.now(timezone.utc)
+        self.media_size = media_size
+        self.download_latency = download_latency
+
+    async def download_media(self, file=None):
+        if self.download_latency:
+            await asyncio.sleep(self.download_latency)
+        suffix = ".jpg" if self.photo else ".mp4"
+        path = Path(file) / f"bench_{self.chat_id}_{self.id}{suffix}"
+        path.write_bytes(b"\0" * self.media_size)
+        return str(path)
+
+    async def get_sender(self):
+        return User(id=abs(self.chat_id), first_name="Bench Channel")
+
+class FakeEvent:
+    def __init__(self, message):
+        self.message = message
+        self.chat_id = message.chat_id
+
+class FakeTelegramClient:
+    """Serves synthetic history and accepts the client calls made by the bridge."""
+    def __init__(self, history=None):
+        self.history = history or {} # tg chat id -> list of FakeMessage, oldest first
+
+    async def get_entity(self, target):
+        return SimpleNamespace(id=target, title=f"Bench {target}", photo=None, left=False)
+
+    async def iter_messages(self, entity, limit=None):
+        for message in reversed(self.history.get(entity.id, [])[-(limit or 0):]):
+            yield message
+
+    async def send_read_acknowledge(self, chat_id, message=None):
+        pass
+
+def synthetic_messages(tg_chat_ids, count, media_size=64 * 1024, seed=1):
+    """Generate a mixed stream of text, photos, albums, replies and button posts."""
+    rng = random.Random(seed)
+    next_ids = {chat_id: 1 for chat_id in tg_chat_ids}
+    grouped_ids = itertools.count(1)
+    messages = []
+    while len(messages) < count:
+        chat_id = tg_chat_ids[len(messages) % len(tg_chat_ids)]
+        kind = rng.choices(["text", "photo", "album", "reply", "buttons"], weights=[50, 20, 10, 10, 10])[0]
+        msg_id = next_ids[chat_id]
+        if kind == "album":
+            grouped_id = next(grouped_ids)
+            for i in range(3):
+                messages.append(FakeMessage(msg_id + i, chat_id, text="album caption" if i == 0 else "",
+                                            photo=True, media_size=media_size, grouped_id=grouped_id))
+            next_ids[chat_id] += 3
+            continue
+        if kind == "photo":
+            message = FakeMessage(msg_id, chat_id, text="photo caption", photo=True, media_size=media_size)
+        elif kind == "reply" and msg_id > 1:
+            message = FakeMessage(msg_id, chat_id, text="reply text", reply_to_msg_id=rng.randint(1, msg_id - 1))
+        elif kind == "buttons":
+            message = FakeMessage(msg_id, chat_id, text="post with links",
+                                  entities=[SimpleNamespace(url=f"https://example.org/{msg_id}")],
+                                  buttons=[[SimpleNamespace(url="https://example.org/subscribe")]])
+        else:
+            message = FakeMessage(msg_id, chat_id, text=f"news update {msg_id} " + "lorem ipsum " * rng.randint(1, 40))
+        messages.append(message)
+        next_ids[chat_id] += 1
+    return messages[:count]
+
+def bench_config(channel_count, window):
+    """A config dict with one mirrored channel per DC chat id starting at 10."""
+    channels = [
+        {"tgid": -1000000000000 - i, "username": f"bench_{i}", "chat_id": 10 + i,
+         "photo": {"enable": True}, "video": {"enable": i % 2 == 0}}
+        for i in range(channel_count)
+    ]
+    return {
+        "active_accid": 1,
+        "admin_password": "bench",
+        "channels_to_mirror": channels,
+        "history_resend": {"enabled": True, "limit": 10},
+        "stats": {"window": window, "log_interval": 0},
+        "mirror_updates": {"edits": False, "deletions": False},
+    }
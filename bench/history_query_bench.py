@@ -0,0 +1,144 @@
+"""Latest-history lookup on a large messages table.
+
+Builds a synthetic messages table (default 10M rows) with the real schema,
+then compares the pre-index get_latest query against
+MessageRepository.get_latest_ids on the covering partial index, and walks
+older pages with keyset pagination. Prints query plans and latencies.
+
+    uv run python bench/history_query_bench.py --rows 10000000 --chats 1000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+import db
+from repository.message_repository import MessageRepository
+
+# The query before schema version 2, pinned to the index it used back then
+OLD_QUERY = """
+    SELECT telegram_msg_id, dc_msg_id, dc_chat_id, text, media_path, media_type, id
+    FROM messages INDEXED BY idx_messages_tgid_chat
+    WHERE dc_chat_id = ? AND dc_msg_id IS NOT NULL
+    ORDER BY telegram_msg_id DESC
+    LIMIT ?
+"""
+
+# MessageRepository.get_latest_ids
+NEW_QUERY = """
+    SELECT telegram_msg_id, dc_msg_id FROM messages
+    WHERE dc_chat_id = ? AND dc_msg_id IS NOT NULL AND telegram_msg_id < ?
+    ORDER BY telegram_msg_id DESC
+    LIMIT ?
+"""
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def populate(db_path, rows, chats, text_size, batch=200_000):
+    db.init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    text = "x" * text_size
+    next_tg_id = [0] * chats
+    start = time.perf_counter()
+    for offset in range(0, rows, batch):
+        chunk = []
+        for i in range(offset, min(offset + batch, rows)):
+            chat = i % chats
+            next_tg_id[chat] += 1
+            # Roughly 1 in 50 sends failed and has no Delta Chat id
+            dc_msg_id = None if i % 47 == 0 else i + 1
+            chunk.append((next_tg_id[chat], dc_msg_id, chat + 1, text, f"data/media/photo_{i}.jpg", "image"))
+        conn.executemany("""
+            INSERT INTO messages (telegram_msg_id, dc_msg_id, dc_chat_id, text, media_path, media_type)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, chunk)
+        conn.commit()
+        print(f"\r  inserted {min(offset + batch, rows):,} rows", end="", flush=True)
+    conn.close()
+    print(f" in {time.perf_counter() - start:.0f}s")
+
+def show_plan(conn, title, sql, params):
+    print(f"\n{title}")
+    for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params):
+        print(f"  {row[3]}")
+
+def timed(func, repeats):
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+def report(label, samples):
+    print(f"  {label:<34} p50={_percentile(samples, 50) * 1000:7.3f}ms  p99={_percentile(samples, 99) * 1000:7.3f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Latest-history query benchmark")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--chats", type=int, default=1000)
+    parser.add_argument("--text-size", type=int, default=300, help="Bytes of stored text per row")
+    parser.add_argument("--limit", type=int, default=10, help="history_resend.limit")
+    parser.add_argument("--repeats", type=int, default=2000)
+    parser.add_argument("--db", help="Reuse or keep the database at this path")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="history-bench-"), "db.sqlite")
+    if not os.path.exists(db_path):
+        print(f"Populating {db_path} with {args.rows:,} rows over {args.chats} chats...")
+        populate(db_path, args.rows, args.chats, args.text_size)
+    else:
+        db.init_db(db_path)
+    print(f"Database size: {os.path.getsize(db_path) / (1024 * 1024):.0f} MB")
+
+    conn = sqlite3.connect(db_path)
+    repo = MessageRepository(db_path)
+    chats = [random.randint(1, args.chats) for _ in range(args.repeats)]
+
+    show_plan(conn, "Old get_latest (full rows):", OLD_QUERY, (1, args.limit))
+    show_plan(conn, "get_latest_ids (first page):", NEW_QUERY, (1, 2**63 - 1, args.limit))
+
+    # Cold-ish comparison: a fresh connection per call, like the repositories
+    print(f"\nLatency over {args.repeats} random chats, limit {args.limit}:")
+    chat_iter = iter(chats)
+    report("old query, full rows", timed(lambda: sqlite3.connect(db_path).execute(OLD_QUERY, (next(chat_iter), args.limit)).fetchall(), args.repeats))
+    chat_iter = iter(chats)
+    report("get_latest_ids (covering index)", timed(lambda: repo.get_latest_ids(next(chat_iter), args.limit), args.repeats))
+    chat_iter = iter(chats)
+    report("get_latest (partial index + rows)", timed(lambda: repo.get_latest(next(chat_iter), args.limit), args.repeats))
+
+    # Keyset pagination: walk back 100 pages of one chat
+    def walk(pages=100):
+        before = None
+        for _ in range(pages):
+            page = repo.get_latest_ids(1, args.limit, before_telegram_msg_id=before)
+            if not page:
+                break
+            before = page[0][0]
+    report("keyset walk, 100 pages", timed(walk, 20))
+
+    # Query cost alone on one connection with a small page cache
+    conn.execute("PRAGMA cache_size = -2000")
+    print("\nSame connection, 2 MB page cache:")
+    chat_iter = iter(chats)
+    report("old query, full rows", timed(lambda: conn.execute(OLD_QUERY, (next(chat_iter), args.limit)).fetchall(), args.repeats))
+    chat_iter = iter(chats)
+    report("covering index, ids only", timed(lambda: conn.execute(NEW_QUERY, (next(chat_iter), 2**63 - 1, args.limit)).fetchall(), args.repeats))
+    conn.close()
+
+if __name__ == "__main__":
+    main()
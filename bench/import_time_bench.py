@@ -0,0 +1,101 @@
+"""Startup cost of each CLI mode, measured with `python -X importtime`.
+
+Every case runs app/main.py (or a bare `import main`) in a fresh process
+inside an empty temporary directory, so no config.yml, account or database
+is touched. Modes that need a Delta Chat account stop early with an error,
+which is fine: by then they have imported everything they need.
+
+    uv run python bench/import_time_bench.py --repeat 5 --top 8
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+MAIN = str(APP_DIR / "main.py")
+
+# name -> arguments after the interpreter; "{tmp}" is the scratch directory
+CASES = {
+    "import": ["-c", "import main"],
+    "bare": [MAIN],
+    "help": [MAIN, "--help"],
+    "link": [MAIN, "--link"],
+    "import-file": [MAIN, "--import", "{tmp}/channels.txt"],
+    "replay": [MAIN, "--replay", "{tmp}/capture.jsonl", "--speed", "max"],
+}
+
+WATCHED = ("telethon", "deltachat2", "asyncio", "yaml", "http.server")
+
+def parse_importtime(stderr: str):
+    """(total self µs, module count, {top-level module: cumulative µs}, imported names)."""
+    total = 0
+    top_level = {}
+    names = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total += int(self_us)
+        module = name.strip()
+        names.add(module)
+        if not name.startswith("  "):
+            # Indentation marks modules imported by another one
+            top_level[module] = int(cumulative_us)
+    return total, len(names), top_level, names
+
+def run_case(name, argv, tmp, repeat):
+    argv = [arg.replace("{tmp}", tmp) for arg in argv]
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(APP_DIR), os.environ.get("PYTHONPATH")]))}
+    walls, imports = [], []
+    for i in range(repeat + 1):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", *argv], cwd=tmp, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, timeout=120)
+        wall = (time.perf_counter() - start) * 1000
+        total, count, top_level, names = parse_importtime(proc.stderr)
+        if i == 0:
+            continue # warm-up run writes the .pyc files
+        walls.append(wall)
+        imports.append(total / 1000)
+    return {
+        "case": name,
+        "exit": proc.returncode,
+        "wall_ms": statistics.median(walls),
+        "import_ms": statistics.median(imports),
+        "modules": count,
+        "loaded": [m for m in WATCHED if m in names],
+        "top": sorted(top_level.items(), key=lambda kv: kv[1], reverse=True),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma-separated subset of: " + ", ".join(CASES))
+    parser.add_argument("--repeat", type=int, default=3, help="Measured runs per case (median is reported)")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest top-level imports to list per case")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        Path(tmp, "channels.txt").write_text("")
+        Path(tmp, "capture.jsonl").write_text("")
+        for name in args.cases.split(","):
+            results.append(run_case(name, CASES[name], tmp, args.repeat))
+
+    print(f"{'case':>12} {'exit':>4} {'wall ms':>8} {'import ms':>9} {'modules':>7}  heavy modules loaded")
+    for r in results:
+        print(f"{r['case']:>12} {r['exit']:>4} {r['wall_ms']:>8.1f} {r['import_ms']:>9.1f} {r['modules']:>7}  {', '.join(r['loaded']) or '-'}")
+    if args.top:
+        for r in results:
+            print(f"\n{r['case']}: " + ", ".join(f"{mod} {us / 1000:.1f}ms" for mod, us in r["top"][:args.top]))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Memory and time to load message mappings into model objects.
+
+Loads the same rows (default 1M) three ways, each in a fresh process:
+- `legacy`: the previous dict-backed @dataclass Message, built field by
+  field with the text column included.
+- `slotted`: MessageRepository.get_latest, slotted Message from a row
+  factory with lazily loaded text.
+- `ids`: MessageRepository.get_latest_ids, plain tuples.
+
+    uv run python bench/model_memory_bench.py --rows 1000000
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+@dataclass
+class LegacyMessage:
+    telegram_msg_id: int
+    dc_msg_id: Optional[int] = None
+    dc_chat_id: Optional[int] = None
+    text: Optional[str] = None
+    media_path: Optional[str] = None
+    media_type: Optional[str] = None
+    id: Optional[int] = None
+
+def load_legacy(db_path, rows):
+    with sqlite3.connect(db_path) as conn:
+        cur = conn.execute("""
+            SELECT telegram_msg_id, dc_msg_id, dc_chat_id, text, media_path, media_type, id
+            FROM messages WHERE dc_chat_id = ? AND dc_msg_id IS NOT NULL
+            ORDER BY telegram_msg_id DESC LIMIT ?
+        """, (1, rows))
+        return [
+            LegacyMessage(telegram_msg_id=row[0], dc_msg_id=row[1], dc_chat_id=row[2], text=row[3],
+                          media_path=row[4], media_type=row[5], id=row[6])
+            for row in cur.fetchall()
+        ]
+
+def run_case(case, db_path, rows, results):
+    from repository.message_repository import MessageRepository
+    repo = MessageRepository(db_path)
+    loaders = {
+        "legacy": lambda: load_legacy(db_path, rows),
+        "slotted": lambda: repo.get_latest(1, limit=rows),
+        "ids": lambda: repo.get_latest_ids(1, limit=rows),
+    }
+    tracemalloc.start()
+    start = time.perf_counter()
+    loaded = loaders[case]()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.put({
+        "case": case,
+        "objects": len(loaded),
+        "seconds": elapsed,
+        "retained_mb": current / (1024 * 1024),
+        "peak_mb": peak / (1024 * 1024),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+def populate(db_path, rows, text_size):
+    import db
+    db.init_db(db_path)
+    text = "x" * text_size
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("""
+            INSERT INTO messages (telegram_msg_id, dc_msg_id, dc_chat_id, text, media_path, media_type)
+            VALUES (?, ?, 1, ?, ?, 'image')
+        """, ((i, i + 1, text, f"data/media/photo_{i}.jpg") for i in range(rows)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Model memory benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--text-size", type=int, default=300, help="Bytes of stored text per row")
+    args = parser.parse_args()
+
+    import logging
+    from logger import logger
+    logger.setLevel(logging.ERROR)
+
+    workdir = tempfile.mkdtemp(prefix="model-bench-")
+    db_path = os.path.join(workdir, "db.sqlite")
+    populate(db_path, args.rows, args.text_size)
+
+    ctx = multiprocessing.get_context("spawn")
+    rows = []
+    for case in ("legacy", "slotted", "ids"):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_case, args=(case, db_path, args.rows, queue))
+        proc.start()
+        rows.append(queue.get())
+        proc.join()
+    os.remove(db_path)
+    os.rmdir(workdir)
+
+    print(f"{'case':>8} {'objects':>9} {'seconds':>8} {'retained MB':>12} {'peak MB':>9} {'peak RSS MB':>12}")
+    for row in rows:
+        print(f"{row['case']:>8} {row['objects']:>9} {row['seconds']:>8.2f} {row['retained_mb']:>12.1f} "
+              f"{row['peak_mb']:>9.1f} {row['peak_rss_mb']:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Offline throughput benchmark for the Telegram -> Delta Chat relay path.
+
+Drives TelegramBridge._relay_message, fetch_history and the log_events /
+handle_msg hooks from run_bot against FakeTelegramClient and FakeRpc, so
+no Telegram account or chatmail server is needed.
+
+    uv run python bench/relay_bench.py --channels 1,100,1000 --messages 5000
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import fakes
+import yaml
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+class FakeHooks:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event_type):
+        def decorator(func):
+            self.handlers[func.__name__] = func
+            return func
+        return decorator
+
+class FakeBot:
+    def __init__(self, rpc, hooks, logger):
+        self.rpc = rpc
+
+    def run_forever(self, accid):
+        pass
+
+def capture_hooks(rpc, bridge):
+    """Run run_bot with stand-ins and return its registered Delta Chat hooks."""
+    # run_bot imports these when it is called, so patch them at their source
+    import deltachat2
+    import telegram_bridge
+    import main
+    deltachat2.Bot = FakeBot
+    telegram_bridge.start_telegram_bridge = lambda config, rpc, msg_repo, chan_repo, bridge_container, capture_file=None, startup=None: bridge_container.update(bridge=bridge)
+    hooks = FakeHooks()
+    main.run_bot(rpc, hooks)
+    return hooks.handlers
+
+def run_scenario(channel_count, message_count, rpc_latency, media_size, results):
+    import logging
+    from logger import logger
+    logger.setLevel(logging.ERROR)
+
+    from db import init_db
+    from repository.channel_repository import ChannelRepository
+    from repository.message_repository import MessageRepository
+    from models.channel import Channel
+    from telegram_bridge import TelegramBridge
+
+    workdir = tempfile.mkdtemp(prefix="bridge-bench-")
+    os.chdir(workdir)
+    db_path = "data/db.sqlite"
+    init_db(db_path)
+
+    config = fakes.bench_config(channel_count, window=message_count)
+    with open("config.yml", "w") as f:
+        yaml.safe_dump(config, f)
+
+    rpc = fakes.FakeRpc(latency=rpc_latency)
+    msg_repo = MessageRepository(db_path)
+    chan_repo = ChannelRepository(db_path)
+    for cfg in config["channels_to_mirror"]:
+        chan_repo.save(Channel(accid=1, chat_id=cfg["chat_id"], name=cfg["username"],
+                               video_enabled=cfg["video"]["enable"]))
+
+    bridge = TelegramBridge(config, rpc, msg_repo, chan_repo)
+    for cfg in config["channels_to_mirror"]:
+        bridge.tg_to_dc_map[cfg["tgid"]] = cfg
+        bridge.target_chats.add(cfg["tgid"])
+    bridge._rebuild_chat_filter()
+
+    tg_ids = [cfg["tgid"] for cfg in config["channels_to_mirror"]]
+    messages = fakes.synthetic_messages(tg_ids, message_count, media_size=media_size)
+
+    async def relay_all():
+        latencies = []
+        start = time.perf_counter()
+        for message in messages:
+            event = fakes.FakeEvent(message)
+            if not bridge._accept_update(event):
+                continue
+            t0 = time.perf_counter()
+            await bridge._relay_message(message, bridge.tg_to_dc_map[event.chat_id], 1)
+            latencies.append(time.perf_counter() - t0)
+        return latencies, time.perf_counter() - start
+
+    async def history():
+        # Every message of the first channel is already mapped, so this measures the resend path
+        first = tg_ids[0]
+        bridge.client = fakes.FakeTelegramClient({first: [m for m in messages if m.chat_id == first]})
+        start = time.perf_counter()
+        await bridge.fetch_history(first, limit=10, accid=1)
+        return time.perf_counter() - start
+
+    latencies, elapsed = asyncio.run(relay_all())
+    history_elapsed = asyncio.run(history())
+
+    handlers = capture_hooks(rpc, bridge)
+    hook_latencies = []
+    bot = FakeBot(rpc, None, None)
+    for cfg in config["channels_to_mirror"]:
+        for kind in ("MemberAdded", "ChatModified"):
+            t0 = time.perf_counter()
+            handlers["log_events"](bot, 1, {"kind": kind, "chat_id": cfg["chat_id"]})
+            hook_latencies.append(time.perf_counter() - t0)
+    inbox_event = SimpleNamespace(msg=SimpleNamespace(chat_id=1, text="hello bot", from_id=42, is_system=False))
+    for _ in range(1000):
+        t0 = time.perf_counter()
+        handlers["handle_msg"](bot, 1, inbox_event)
+        hook_latencies.append(time.perf_counter() - t0)
+
+    results.put({
+        "channels": channel_count,
+        "messages": len(latencies),
+        "msgs_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "db_ms": (bridge.stats.total("db_lookup") + bridge.stats.total("save_mapping")) * 1000,
+        "history_ms": history_elapsed * 1000,
+        "hook_p99_ms": _percentile(hook_latencies, 99) * 1000,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "rpc_calls": rpc.calls,
+    })
+    shutil.rmtree(workdir, ignore_errors=True)
+
+def _collect(proc, results, timeout):
+    """The scenario's result row, or an error string if it crashed or timed out."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            row = results.get(timeout=1)
+            proc.join()
+            return row
+        except queue.Empty:
+            pass
+        if not proc.is_alive():
+            proc.join()
+            return f"exited with code {proc.exitcode} without a result"
+        if time.monotonic() > deadline:
+            proc.terminate()
+            proc.join()
+            return f"timed out after {timeout:.0f}s"
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline relay benchmark")
+    parser.add_argument("--channels", default="1,100,1000", help="Comma separated channel counts")
+    parser.add_argument("--messages", type=int, default=2000, help="Messages relayed per scenario")
+    parser.add_argument("--rpc-latency-ms", type=float, default=0.0, help="Simulated Delta Chat RPC latency")
+    parser.add_argument("--media-kb", type=int, default=64, help="Size of synthetic photo downloads")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds before a scenario is aborted")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    # Each scenario runs in a fresh interpreter so peak RSS is not shared
+    ctx = multiprocessing.get_context("spawn")
+    rows, failed = [], []
+    for channel_count in [int(c) for c in args.channels.split(",")]:
+        results = ctx.Queue()
+        proc = ctx.Process(target=run_scenario, args=(channel_count, args.messages, args.rpc_latency_ms / 1000, args.media_kb * 1024, results))
+        proc.start()
+        row = _collect(proc, results, args.timeout)
+        if isinstance(row, str):
+            print(f"Scenario with {channel_count} channels failed: {row}", file=sys.stderr)
+            failed.append(channel_count)
+        else:
+            rows.append(row)
+
+    print(f"{'channels':>8} {'msgs':>6} {'msg/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'db ms':>9} {'history ms':>11} {'hook p99 ms':>12} {'peak RSS MB':>12}")
+    for row in rows:
+        print(f"{row['channels']:>8} {row['messages']:>6} {row['msgs_per_sec']:>9.1f} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+              f"{row['db_ms']:>9.1f} {row['history_ms']:>11.1f} {row['hook_p99_ms']:>12.2f} {row['peak_rss_mb']:>12.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()